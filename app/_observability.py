@@ -0,0 +1,47 @@
+"""
+Logfire setup shared by every entry point.
+"""
+import os
+from contextlib import contextmanager
+
+import logfire
+
+# LOGFIRE_SAMPLE=0 drops the per-email spans on high-volume bursts
+TRACE = os.environ.get("LOGFIRE_SAMPLE", "1") == "1"
+
+_configured = False
+
+
+def configure():
+    """Configure logfire and Pydantic instrumentation once per process."""
+    global _configured
+    if _configured:
+        return
+
+    logfire.configure()
+    logfire.instrument_pydantic()
+    _configured = True
+
+
+def instrument_lambda(lambda_handler):
+    """
+    Instrument a Lambda handler with logfire.
+
+    Only runs inside the Lambda runtime, so tests and local scripts that import
+    a handler module skip loading the OpenTelemetry Lambda instrumentation.
+    """
+    if not os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+        return
+
+    configure()
+    logfire.instrument_aws_lambda(lambda_handler)
+
+
+@contextmanager
+def maybe_span(name, **attributes):
+    """logfire.span for the per-record hot path, a no-op when TRACE is off."""
+    if TRACE:
+        with logfire.span(name, **attributes) as span:
+            yield span
+    else:
+        yield None
@@ -1,10 +1,10 @@
 import logfire
-import json
+import orjson
 from datetime import datetime
 from typing import Dict, Any, Optional
+from app import _observability
 
-logfire.configure()
-logfire.instrument_pydantic()
+_observability.configure()
 
 
 def lambda_handler(event: Dict[str, Any], context) -> Dict[str, Any]:
@@ -47,7 +47,7 @@ def lambda_handler(event: Dict[str, Any], context) -> Dict[str, Any]:
                 return create_response(500, {'message': 'Internal Server Error'})
 
 
-logfire.instrument_aws_lambda(lambda_handler)
+_observability.instrument_lambda(lambda_handler)
 
 
 def create_response(status_code: int, body: Dict[str, Any]) -> Dict[str, Any]:
@@ -59,7 +59,7 @@ def create_response(status_code: int, body: Dict[str, Any]) -> Dict[str, Any]:
             'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
             'Access-Control-Allow-Headers': 'Content-Type, Authorization'
         },
-        'body': json.dumps(body)
+        'body': orjson.dumps(body).decode()
     }
     logfire.info("response", response=response)
     return response
@@ -127,7 +127,7 @@ def create_booking(event: Dict[str, Any]) -> Dict[str, Any]:
     with logfire.span("create_booking", event=event):
         try:
             # Parse request body
-            body = json.loads(event.get('body', '{}'))
+            body = orjson.loads(event.get('body', '{}'))
 
             # Validate required fields
             required_fields = ['customer_name', 'date', 'time', 'service']
@@ -157,7 +157,7 @@ def create_booking(event: Dict[str, Any]) -> Dict[str, Any]:
                 'booking': new_booking
             })
 
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             return create_response(400, {'message': 'Invalid JSON in request body'})
 
 
@@ -194,7 +194,7 @@ def update_booking(booking_id: str, event: Dict[str, Any]) -> Dict[str, Any]:
 
         try:
             # Parse request body
-            body = json.loads(event.get('body', '{}'))
+            body = orjson.loads(event.get('body', '{}'))
 
             # Mock: Check if booking exists
             if booking_id not in ['1', '2', '3']:  # Simple mock check
@@ -218,7 +218,7 @@ def update_booking(booking_id: str, event: Dict[str, Any]) -> Dict[str, Any]:
                 'booking': updated_booking
             })
 
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             return create_response(400, {'message': 'Invalid JSON in request body'})
 
 
@@ -1,15 +1,16 @@
 import os
+import traceback
 import logfire
-import json
+import orjson
 from typing import Dict, Any, Optional, List
 from decimal import Decimal
 from pydantic import BaseModel
 from app.models.booking import City, Visit
 from app.functions.common import store_result, get_booking_by_confirmation, normalize_booking_data
 from app.functions.geocoding import geocode_address
+from app import _observability
 
-logfire.configure()
-logfire.instrument_pydantic()
+_observability.configure()
 
 
 # Helper class for storing cities in DynamoDB (visits as dict list)
@@ -36,8 +37,8 @@ def lambda_handler(event: Dict[str, Any], context) -> Dict[str, Any]:
         # Parse body if it's a string
         if isinstance(body, str):
             try:
-                body = json.loads(body)
-            except json.JSONDecodeError:
+                body = orjson.loads(body)
+            except orjson.JSONDecodeError:
                 body = {}
         
         # Normalize path for routing
@@ -76,12 +77,11 @@ def lambda_handler(event: Dict[str, Any], context) -> Dict[str, Any]:
 
             except Exception as e:
                 logfire.error("Error processing request:", error=e)
-                import traceback
                 logfire.error("Traceback", traceback=traceback.format_exc())
                 return create_response(500, {'message': 'Internal Server Error', 'error': str(e)})
 
 
-logfire.instrument_aws_lambda(lambda_handler)
+_observability.instrument_lambda(lambda_handler)
 
 
 def create_response(status_code: int, body: Dict[str, Any]) -> Dict[str, Any]:
@@ -94,7 +94,7 @@ def create_response(status_code: int, body: Dict[str, Any]) -> Dict[str, Any]:
             'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
             'Access-Control-Allow-Headers': 'Content-Type, Authorization'
         },
-        'body': json.dumps(body)
+        'body': orjson.dumps(body).decode()
     }
     logfire.info("response", status_code=status_code)
     return response
@@ -178,7 +178,7 @@ def create_city(body: Dict[str, Any]) -> Dict[str, Any]:
             
             city_storage = CityForStorage(**city_dict)
             table_name = os.environ.get("BOOKINGS_TABLE_NAME", "bookings")
-            store_result(city_storage, table_name, {"confirmation": city_id})
+            store_result(city_storage, table_name, {"confirmation": city_id}, expect_new=True)
             
             logfire.info("City created successfully", city_id=city_id, city_name=city_name)
             
@@ -1,6 +1,7 @@
 import logfire
-logfire.configure()
-logfire.instrument_pydantic()
+from app import _observability
+
+_observability.configure()
 
 
 def lambda_handler(event, context):
@@ -9,7 +10,7 @@ def lambda_handler(event, context):
     my_lambda_function(foo, bar)
 
 
-logfire.instrument_aws_lambda(lambda_handler)
+_observability.instrument_lambda(lambda_handler)
 
 
 def my_lambda_function(foo, bar):
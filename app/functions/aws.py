@@ -0,0 +1,30 @@
+"""
+Shared boto3 clients and resources.
+"""
+from functools import lru_cache
+
+import boto3
+from botocore.config import Config
+
+# One connection pool per client, sized for the parallel S3 downloads, with
+# adaptive retries so throttled DynamoDB/S3 calls back off client-side
+BOTO_CONFIG = Config(
+    max_pool_connections=32,
+    retries={"mode": "adaptive", "max_attempts": 5},
+)
+
+# Every client and resource comes from this one session, so the credential
+# chain is resolved once per process and the cached credentials are shared
+_SESSION = boto3.session.Session()
+
+
+@lru_cache(maxsize=None)
+def get_client(service_name: str):
+    """Return the process-wide boto3 client for a service."""
+    return _SESSION.client(service_name, config=BOTO_CONFIG)
+
+
+@lru_cache(maxsize=None)
+def get_resource(service_name: str):
+    """Return the process-wide boto3 resource for a service."""
+    return _SESSION.resource(service_name, config=BOTO_CONFIG)
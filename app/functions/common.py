@@ -1,11 +1,51 @@
 import os
-import boto3
+import random
+import time
+import traceback
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
 from botocore.exceptions import ClientError
-from datetime import datetime
+from datetime import datetime, timezone
 import logfire
 from typing import Optional, Dict, Any, Type
+from app.functions.aws import get_client, get_resource
 
-dynamodb = boto3.resource("dynamodb")
+dynamodb = get_resource("dynamodb")
+# Plain client for requests built from already-marshalled values; the
+# resource's meta.client would run its serializer over them a second time
+dynamodb_client = get_client("dynamodb")
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+# Always update these fields
+_TIMESTAMP_UPDATE_PARTS = (
+    "updated_at = :updated_at",
+    "created_at = if_not_exists(created_at, :created_at)",
+)
+
+# Retries for UnprocessedKeys: exponential backoff with full jitter, so a
+# throttled table isn't hammered with immediate re-sends
+BATCH_GET_MAX_RETRIES = 8
+BATCH_GET_BACKOFF_BASE = 0.05
+BATCH_GET_BACKOFF_MAX = 2.0
+
+
+def utc_now_iso() -> str:
+    """Current UTC time as the ISO string stored in created_at/updated_at."""
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def month_partition(date_str) -> Optional[str]:
+    """
+    YYYY-MM partition key for the check-in date index, or None if the date isn't ISO.
+
+    Stored as check_in_month so date-range lookups can Query the GSI one
+    month at a time instead of scanning the table.
+    """
+    if (isinstance(date_str, str) and len(date_str) >= 10 and date_str[4] == "-"
+            and date_str[7] == "-" and date_str[:4].isdigit() and date_str[5:7].isdigit()):
+        return date_str[:7]
+    return None
 
 
 def update_table(
@@ -14,19 +54,15 @@ def update_table(
         table_name
 ):
     values_dict = model.model_dump(exclude_unset=True)
-    table = dynamodb.Table(table_name)
+    month = month_partition(values_dict.get("check_in_date"))
+    if month:
+        values_dict["check_in_month"] = month
     # Prepare DynamoDB item (upsert)
-    now = datetime.utcnow().isoformat()
+    now = _serializer.serialize(utc_now_iso())
 
-    update_parts = []
+    update_parts = list(_TIMESTAMP_UPDATE_PARTS)
     expression_attribute_names = {}
-    expression_attribute_values = {}
-
-    # Always update these fields
-    update_parts.append("updated_at = :updated_at")
-    update_parts.append("created_at = if_not_exists(created_at, :created_at)")
-    expression_attribute_values[":updated_at"] = now
-    expression_attribute_values[":created_at"] = now
+    expression_attribute_values = {":updated_at": now, ":created_at": now}
 
     # Dynamically process all fields from the model
     # Use expression attribute names (#alias) for all fields to avoid DynamoDB reserved keyword conflicts
@@ -40,13 +76,14 @@ def update_table(
         alias = f"#f_{field_name}"
         update_parts.append(f"{alias} = :{field_name}")
         expression_attribute_names[alias] = field_name
-        expression_attribute_values[f":{field_name}"] = field_value
+        expression_attribute_values[f":{field_name}"] = _serializer.serialize(field_value)
 
     # Build the update expression
     update_expression = "SET " + ", ".join(update_parts)
 
     update_kwargs = {
-        "Key": key_object,
+        "TableName": table_name,
+        "Key": {k: _serializer.serialize(v) for k, v in key_object.items()},
         "UpdateExpression": update_expression,
         "ExpressionAttributeValues": expression_attribute_values,
         "ReturnValues": "ALL_NEW",
@@ -54,14 +91,49 @@ def update_table(
     if expression_attribute_names:
         update_kwargs["ExpressionAttributeNames"] = expression_attribute_names
 
-    response = table.update_item(**update_kwargs)
+    # Low-level client: values are already marshalled, so the Resource layer's
+    # per-call expression/serializer transformation is skipped
+    response = dynamodb_client.update_item(**update_kwargs)
+    if "Attributes" in response:
+        response["Attributes"] = {
+            k: _deserializer.deserialize(v) for k, v in response["Attributes"].items()
+        }
 
     return response
 
-def store_result(parsed, table_name, key):
+
+def put_new_item(model, key_object, table_name):
+    """
+    Insert a new item with one conditional PutItem, no UpdateExpression to build.
+
+    If the key already exists the put is rejected by attribute_not_exists and
+    we fall back to update_table so existing attributes and created_at survive.
+    """
+    item = merge_item(model, key_object)
+    condition = " AND ".join(f"attribute_not_exists(#k_{k})" for k in key_object)
+
+    try:
+        dynamodb_client.put_item(
+            TableName=table_name,
+            Item={k: _serializer.serialize(v) for k, v in item.items()},
+            ConditionExpression=condition,
+            ExpressionAttributeNames={f"#k_{k}": k for k in key_object},
+        )
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+            raise
+        return update_table(model, key_object, table_name)
+
+    return {"Attributes": item}
+
+
+def store_result(parsed, table_name, key, expect_new: bool = False):
     with logfire.span("store_result", key=key, table_name=table_name, object=parsed):
         try:
-            response = update_table(parsed, key, table_name)
+            if expect_new:
+                response = put_new_item(parsed, key, table_name)
+            else:
+                response = update_table(parsed, key, table_name)
 
             logfire.info(
                 "DynamoDB update_item response",
@@ -85,11 +157,98 @@ def store_result(parsed, table_name, key):
                 error=str(e),
                 error_type=type(e).__name__,
                 table_name=table_name)
-            import traceback
             print(traceback.format_exc(), flush=True)
             raise
 
 
+def merge_item(model, key_object, existing=None, now=None) -> Dict[str, Any]:
+    """
+    Build a full item for PutItem with the same merge rules as update_table.
+
+    Fields from the model overwrite the existing item, empty strings never
+    clobber stored values, and created_at is kept from the existing item.
+    """
+    now = now or utc_now_iso()
+    item = dict(existing or {})
+
+    for field_name, field_value in model.model_dump(exclude_unset=True).items():
+        if field_name == "website":
+            field_value = str(field_value)
+
+        if field_name in key_object or field_value == "":
+            continue
+
+        item[field_name] = field_value
+
+    item.update(key_object)
+    month = month_partition(item.get("check_in_date"))
+    if month:
+        item["check_in_month"] = month
+    item["updated_at"] = now
+    item.setdefault("created_at", now)
+    return item
+
+
+def batch_get_items(keys, table_name, key_name: str = "confirmation") -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch existing items with BatchGetItem, returned as a dict keyed by key_name.
+
+    Keys are de-duplicated and requested 100 at a time (the BatchGetItem limit);
+    unprocessed keys are retried with jittered exponential backoff, and a
+    RuntimeError is raised if some are still unprocessed after
+    BATCH_GET_MAX_RETRIES retries.
+    """
+    unique_keys = list(dict.fromkeys(keys))
+    found = {}
+
+    with logfire.span("batch_get_items", table_name=table_name, count=len(unique_keys)):
+        for start in range(0, len(unique_keys), 100):
+            request_items = {
+                table_name: {"Keys": [{key_name: k} for k in unique_keys[start:start + 100]]}
+            }
+            attempt = 0
+            while request_items:
+                if attempt:
+                    if attempt > BATCH_GET_MAX_RETRIES:
+                        raise RuntimeError(
+                            f"BatchGetItem on {table_name} still had unprocessed keys "
+                            f"after {BATCH_GET_MAX_RETRIES} retries"
+                        )
+                    time.sleep(random.uniform(0, min(BATCH_GET_BACKOFF_MAX, BATCH_GET_BACKOFF_BASE * 2 ** attempt)))
+                response = dynamodb.batch_get_item(RequestItems=request_items)
+                for item in response.get("Responses", {}).get(table_name, []):
+                    found[item[key_name]] = item
+                request_items = response.get("UnprocessedKeys") or None
+                attempt += 1
+
+    return found
+
+
+def batch_store_results(items, table_name, key_name: str = "confirmation"):
+    """
+    Write full items with a single batch_writer (25 PutItems per request).
+
+    Items should be built with merge_item so existing attributes and
+    created_at survive the overwrite.
+    """
+    with logfire.span("batch_store_results", table_name=table_name, count=len(items)):
+        try:
+            table = dynamodb.Table(table_name)
+            with table.batch_writer(overwrite_by_pkeys=[key_name]) as writer:
+                for item in items:
+                    writer.put_item(Item=item)
+        except ClientError as e:
+            error_code = e.response.get("Error", {}).get("Code", "Unknown")
+            error_message = e.response.get("Error", {}).get("Message", str(e))
+            logfire.error(
+                "DynamoDB ClientError",
+                error_code=error_code,
+                error_message=error_message,
+                table_name=table_name
+            )
+            raise
+
+
 def get_booking_by_confirmation(confirmation: str) -> Optional[Dict[str, Any]]:
     with logfire.span("get_booking_by_confirmation", confirmation=confirmation):
         try:
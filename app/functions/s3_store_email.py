@@ -1,20 +1,70 @@
+import io
 import os
-import boto3
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import unquote_plus
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
+from app import _observability
 from app.parsers.booking import parse_email
 import logfire
-from app.models.booking import BookingWithMeta, FullBookingTable
-from app.functions.common import store_result, get_booking_by_confirmation, normalize_booking_data
+from app.models.booking import BookingWithMeta
+from app.functions.common import (
+    batch_get_items,
+    batch_store_results,
+    get_booking_by_confirmation,
+    merge_item,
+    utc_now_iso,
+)
+from app.functions.aws import BOTO_CONFIG, get_client
 from app.functions.geocoding import geocode_address
 from typing import Optional, Dict, Any
 from decimal import Decimal
 
 # Configure logfire once at module level
-logfire.configure()
-logfire.instrument_pydantic()
+_observability.configure()
 
-s3 = boto3.client("s3")
-dynamodb = boto3.resource("dynamodb")
+# Max parallel S3 downloads per invocation (the shared client pool is sized above this)
+S3_MAX_WORKERS = 16
+
+# boto3 clients are thread-safe, so one client is shared by all download threads
+s3 = get_client("s3")
+
+# Emails this large (usually from attachments) are fetched with parallel
+# ranged GETs; anything smaller is a single GetObject read in one call
+MULTIPART_DOWNLOAD_THRESHOLD = 8 * 1024 * 1024
+_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=MULTIPART_DOWNLOAD_THRESHOLD,
+    multipart_chunksize=4 * 1024 * 1024,
+    io_chunksize=1024 * 1024,
+    # Ranged GETs share the client's pool with the other download threads, so
+    # S3_MAX_WORKERS large emails at once must still fit in max_pool_connections
+    max_concurrency=max(1, BOTO_CONFIG.max_pool_connections // S3_MAX_WORKERS),
+)
+
+# (key, eTag) of objects already handled by this warm container. S3 can deliver
+# the same notification more than once; replays are skipped before the GET and
+# the LLM call. Oldest entries are evicted past the cap.
+SEEN_OBJECTS_MAX = 10_000
+_seen_objects: "OrderedDict[tuple, None]" = OrderedDict()
+
+
+def _mark_seen(object_id: tuple) -> None:
+    _seen_objects[object_id] = None
+    _seen_objects.move_to_end(object_id)
+    while len(_seen_objects) > SEEN_OBJECTS_MAX:
+        _seen_objects.popitem(last=False)
+
+
+def _fetch_email(bucket_name: str, object_key: str, size: int = 0) -> bytes:
+    """Download a raw email from S3, using the event's size hint to pick the transfer mode."""
+    if size >= MULTIPART_DOWNLOAD_THRESHOLD:
+        buffer = io.BytesIO()
+        s3.download_fileobj(bucket_name, object_key, buffer, Config=_TRANSFER_CONFIG)
+        return buffer.getvalue()
+
+    obj = s3.get_object(Bucket=bucket_name, Key=object_key)
+    return obj["Body"].read()
 
 
 def lambda_handler(event, context):
@@ -25,7 +75,8 @@ def lambda_handler(event, context):
         event_records=len(event.get("Records", []))
     )
 
-    # S3 can batch multiple records; handle them in a loop
+    # S3 can batch multiple records; collect the object keys first
+    s3_objects = []
     for record in event.get("Records", []):
         event_source = record.get("eventSource") or record.get("EventSource")
         if event_source != "aws:s3":
@@ -33,97 +84,133 @@ def lambda_handler(event, context):
             continue
 
         s3_info = record["s3"]
-        bucket_name = s3_info["bucket"]["name"]
-        object_key = s3_info["object"]["key"]
-
-        with logfire.span("process_email", bucket=bucket_name, key=object_key):
-            try:
-                obj = s3.get_object(Bucket=bucket_name, Key=object_key)
-                raw_bytes = obj["Body"].read()
-                logfire.info("Fetched email from S3", bucket=bucket_name, key=object_key, size=len(raw_bytes))
-            except ClientError as e:
-                logfire.error("Error fetching object from S3", bucket=bucket_name, key=object_key, error=str(e))
-                continue
-
-            try:
-                # call openAI to parse email
-                base_booking = parse_email(raw_bytes)
-                booking = BookingWithMeta(
-                    **base_booking.model_dump(),
-                    source_key=object_key,
-                )
-                logfire.info("Email parsed successfully", confirmation=booking.confirmation)
-            except ValueError as e:
-                # Email is not a booking (e.g., marketing email) - log and continue
-                logfire.info("Skipping non-booking email", bucket=bucket_name, key=object_key, reason=str(e))
-                continue
-            except Exception as e:
-                # Other parsing errors - log and continue
-                logfire.error("Error parsing email", bucket=bucket_name, key=object_key, error=str(e))
-                continue
-
-        store_result(
-            booking,
-            os.environ.get("BOOKINGS_TABLE_NAME", "bookings"),
-            {"confirmation": booking.confirmation}
-        )
+        # Object keys arrive URL-encoded in S3 event notifications
+        object_key = unquote_plus(s3_info["object"]["key"])
+        object_id = (object_key, s3_info["object"].get("eTag"))
+        if object_id[1] and object_id in _seen_objects:
+            logfire.info("Skipping already processed object", key=object_key, etag=object_id[1])
+            continue
 
-        with logfire.span("clean and validate"):
-            booking_data = get_booking_by_confirmation(booking.confirmation)
-            if booking_data:
-                # Normalize the data to ensure all fields are present (None/empty string for missing)
-                # This prevents KeyError when accessing fields that don't exist in DynamoDB
-                normalized_data = normalize_booking_data(booking_data, FullBookingTable)
-                # Use model_construct to allow None values for missing fields without validation errors
-                booking_retrieved = FullBookingTable.model_construct(**normalized_data)
-            else:
-                logfire.warning("Booking not found in database", confirmation=booking.confirmation)
-                continue
-            
-            # Check if latitude is missing, None, or empty string
-            if not booking_retrieved.latitude or booking_retrieved.latitude == "":
-                # Build full address, handling None values
-                address_parts = []
-                if booking_retrieved.street_address:
-                    address_parts.append(booking_retrieved.street_address)
-                if booking_retrieved.city:
-                    address_parts.append(booking_retrieved.city)
-                if booking_retrieved.postal_code:
-                    address_parts.append(booking_retrieved.postal_code)
-                
-                if address_parts:
-                    full_address = " ".join(address_parts)
-                    logfire.info("geocoding", full_address=full_address)
-                    geocode_result = geocode_address(full_address)
-                    if geocode_result:
-                        # Convert float values to Decimal for DynamoDB compatibility
-                        latitude = geocode_result.get('latitude')
-                        longitude = geocode_result.get('longitude')
-                        if latitude is not None:
-                            booking_retrieved.latitude = Decimal(str(latitude))
-                        if longitude is not None:
-                            booking_retrieved.longitude = Decimal(str(longitude))
-                        logfire.info("geocode complete", 
-                                   latitude=latitude, 
-                                   longitude=longitude,
-                                   geocode_result=geocode_result)
-                    else:
-                        logfire.warning("Geocoding returned no result", full_address=full_address)
-                else:
-                    logfire.warning(
-                        "No address components available for geocoding",
-                        confirmation=booking.confirmation
+        s3_objects.append((
+            s3_info["bucket"]["name"],
+            object_key,
+            s3_info["object"].get("size", 0),
+            object_id,
+        ))
+
+    if not s3_objects:
+        return {"statusCode": 200, "body": "OK"}
+
+    # Download in parallel and parse each email as soon as its download finishes,
+    # so LLM calls overlap with the remaining GETs
+    bookings = []
+    with ThreadPoolExecutor(max_workers=min(S3_MAX_WORKERS, len(s3_objects))) as executor:
+        futures = {
+            executor.submit(_fetch_email, bucket_name, object_key, size): (bucket_name, object_key, object_id)
+            for bucket_name, object_key, size, object_id in s3_objects
+        }
+        for future in as_completed(futures):
+            bucket_name, object_key, object_id = futures[future]
+
+            with _observability.maybe_span("process_email", bucket=bucket_name, key=object_key):
+                try:
+                    raw_bytes = future.result()
+                    if _observability.TRACE:
+                        logfire.info("Fetched email from S3", bucket=bucket_name, key=object_key, size=len(raw_bytes))
+                except ClientError as e:
+                    logfire.error("Error fetching object from S3", bucket=bucket_name, key=object_key, error=str(e))
+                    continue
+
+                try:
+                    # call openAI to parse email
+                    base_booking = parse_email(raw_bytes)
+                    # parse_email already validated the booking; attach the key without re-validating
+                    booking = BookingWithMeta.model_construct(
+                        **dict(base_booking),
+                        source_key=object_key,
                     )
-
-        with logfire.span("re-save booking"):
-            store_result(
-                booking_retrieved,
-                os.environ.get("BOOKINGS_TABLE_NAME", "bookings"),
-                {"confirmation": booking_retrieved.confirmation}
+                    logfire.info("Email parsed successfully", confirmation=booking.confirmation)
+                except ValueError as e:
+                    # Email is not a booking (e.g., marketing email) - log and continue
+                    logfire.info("Skipping non-booking email", bucket=bucket_name, key=object_key, reason=str(e))
+                    if object_id[1]:
+                        _mark_seen(object_id)
+                    continue
+                except Exception as e:
+                    # Other parsing errors - log and continue
+                    logfire.error("Error parsing email", bucket=bucket_name, key=object_key, error=str(e))
+                    continue
+
+            bookings.append((booking, object_id))
+
+    if not bookings:
+        return {"statusCode": 200, "body": "OK"}
+
+    table_name = os.environ.get("BOOKINGS_TABLE_NAME", "bookings")
+    existing_items = batch_get_items([b.confirmation for b, _ in bookings], table_name)
+
+    # One timestamp for the whole batch
+    now = utc_now_iso()
+    items = []
+    with logfire.span("clean and validate", count=len(bookings)):
+        for booking, _ in bookings:
+            item = merge_item(
+                booking,
+                {"confirmation": booking.confirmation},
+                existing_items.get(booking.confirmation),
+                now=now,
             )
+            _geocode_item(item)
+            items.append(item)
+
+    batch_store_results(items, table_name)
+
+    # Only remember objects once they are stored, so failed records are retried
+    for _, object_id in bookings:
+        if object_id[1]:
+            _mark_seen(object_id)
     return {"statusCode": 200, "body": "OK"}
 
 
+def _geocode_item(item: Dict[str, Any]) -> None:
+    """Add latitude/longitude to a booking item in place if it doesn't have them yet."""
+    # Check if latitude is missing, None, or empty string
+    if item.get("latitude"):
+        return
+
+    # Build full address, handling None values
+    address_parts = []
+    if item.get("street_address"):
+        address_parts.append(item["street_address"])
+    if item.get("city"):
+        address_parts.append(item["city"])
+    if item.get("postal_code"):
+        address_parts.append(item["postal_code"])
+
+    if not address_parts:
+        logfire.warning(
+            "No address components available for geocoding",
+            confirmation=item.get("confirmation")
+        )
+        return
+
+    full_address = " ".join(address_parts)
+    logfire.info("geocoding", full_address=full_address)
+    geocode_result = geocode_address(full_address)
+    if geocode_result:
+        # Convert float values to Decimal for DynamoDB compatibility
+        latitude = geocode_result.get('latitude')
+        longitude = geocode_result.get('longitude')
+        if latitude is not None:
+            item["latitude"] = Decimal(str(latitude))
+        if longitude is not None:
+            item["longitude"] = Decimal(str(longitude))
+        logfire.info("geocode complete",
+                     latitude=latitude,
+                     longitude=longitude,
+                     geocode_result=geocode_result)
+    else:
+        logfire.warning("Geocoding returned no result", full_address=full_address)
 
 
 def get_booking_with_coordinates(confirmation: str, table_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
@@ -155,4 +242,4 @@ def get_booking_with_coordinates(confirmation: str, table_name: Optional[str] =
     return booking
 
 
-logfire.instrument_aws_lambda(lambda_handler)
+_observability.instrument_lambda(lambda_handler)
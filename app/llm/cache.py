@@ -0,0 +1,72 @@
+"""
+DynamoDB-backed cache of LLM extraction results, keyed by a hash of the prompt.
+"""
+import hashlib
+import os
+import time
+from typing import Optional, Dict, Any
+from botocore.exceptions import BotoCoreError, ClientError
+from app.functions.aws import get_resource
+import logfire
+
+# Cached extractions expire via the table's TTL attribute
+CACHE_TTL_SECONDS = 90 * 24 * 60 * 60
+
+
+def _cache_table():
+    """Return the cache table, or None when caching is not configured."""
+    table_name = os.environ.get("LLM_CACHE_TABLE_NAME")
+    if not table_name:
+        return None
+    return get_resource("dynamodb").Table(table_name)
+
+
+def prompt_digest(*parts: str, prefix=None):
+    """
+    Running SHA-256 over prompt parts.
+
+    Pass the digest of the fixed parts (model, system prompt, tool schema) as
+    prefix and only the per-call parts are hashed; it is copied, never updated.
+    """
+    digest = prefix.copy() if prefix is not None else hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest
+
+
+def prompt_hash(*parts: str, prefix=None) -> str:
+    """SHA-256 over every input that affects the LLM output (model, prompt, email text)."""
+    return prompt_digest(*parts, prefix=prefix).hexdigest()
+
+
+def get_cached_extraction(key: str) -> Optional[Dict[str, Any]]:
+    """Return a cached extraction result dict, or None on a miss or cache error."""
+    table = _cache_table()
+    if table is None:
+        return None
+
+    try:
+        response = table.get_item(Key={"prompt_hash": key})
+    except (ClientError, BotoCoreError) as e:
+        logfire.warning("LLM cache lookup failed", error=str(e))
+        return None
+
+    item = response.get("Item")
+    return item.get("result") if item else None
+
+
+def put_cached_extraction(key: str, result: Dict[str, Any]) -> None:
+    """Store an extraction result; failures are logged and otherwise ignored."""
+    table = _cache_table()
+    if table is None:
+        return
+
+    try:
+        table.put_item(Item={
+            "prompt_hash": key,
+            "result": result,
+            "expires_at": int(time.time()) + CACHE_TTL_SECONDS,
+        })
+    except (ClientError, BotoCoreError) as e:
+        logfire.warning("LLM cache write failed", error=str(e))
@@ -1,8 +1,8 @@
 import anthropic
 import os
-import boto3
 import json
 from botocore.exceptions import ClientError
+from app.functions.aws import get_client
 
 
 def get_anthropic_api_key():
@@ -14,7 +14,7 @@ def get_anthropic_api_key():
     secret_arn = os.getenv("TRAVEL_ANTHROPIC_API_KEY_SECRET_ARN")
     if secret_arn:
         try:
-            secrets_client = boto3.client("secretsmanager")
+            secrets_client = get_client("secretsmanager")
             response = secrets_client.get_secret_value(SecretId=secret_arn)
             secret = json.loads(response["SecretString"])
             return secret.get("api_key")
@@ -25,4 +25,6 @@ def get_anthropic_api_key():
     return None
 
 
+# Module-level client: its pooled keep-alive connections are reused across warm
+# Lambda invocations, so only a cold start pays the TCP/TLS handshake.
 client = anthropic.Anthropic(api_key=get_anthropic_api_key())
@@ -1,60 +1,20 @@
 import json
 from datetime import datetime
+from pydantic import TypeAdapter
 from app.models.booking import ExtractionResult, get_extract_booking_tool
 from app.llm.client import client
+from app.llm.cache import get_cached_extraction, prompt_digest, prompt_hash, put_cached_extraction
+from app import _observability
 import logfire
 
-logfire.configure()
+_observability.configure()
 
+MODEL = "claude-haiku-4-5-20251001"
 
-def _normalize_date(date_str: str) -> str:
-    """Try to parse various date formats and return ISO format (YYYY-MM-DD)."""
-    if not date_str or date_str == "<UNKNOWN>":
-        return date_str
-
-    # Already ISO format
-    if len(date_str) == 10 and date_str[4] == "-" and date_str[7] == "-":
-        return date_str
+# Built once so each extraction reuses the compiled validator
+_EXTRACTION_ADAPTER = TypeAdapter(ExtractionResult)
 
-    formats = [
-        "%d/%m/%Y",           # 12/05/2026
-        "%m/%d/%Y",           # 05/12/2026
-        "%B %d, %Y",         # May 12, 2026
-        "%b %d, %Y",         # May 12, 2026
-        "%A, %B %d, %Y",    # Saturday, May 9, 2026
-        "%d %B %Y",          # 12 May 2026
-        "%d %b %Y",          # 12 May 2026
-        "%Y-%m-%dT%H:%M:%S", # 2026-05-12T00:00:00
-    ]
-    for fmt in formats:
-        try:
-            return datetime.strptime(date_str.strip(), fmt).strftime("%Y-%m-%d")
-        except ValueError:
-            continue
-
-    logfire.warning("Could not normalize date", date_str=date_str)
-    return date_str
-
-
-def _normalize_booking_dates(result: ExtractionResult) -> ExtractionResult:
-    """Normalize all date fields in an extraction result to ISO format."""
-    if not result.booking:
-        return result
-
-    b = result.booking
-    date_fields = ["check_in_date", "check_out_date", "booking_date"]
-    for field in date_fields:
-        val = getattr(b, field, None)
-        if val:
-            setattr(b, field, _normalize_date(val))
-
-    return result
-
-
-def llm_extract_email(email_text: str) -> ExtractionResult:
-    with logfire.span("llm_extract_email", email_length=len(email_text)):
-        tool = get_extract_booking_tool()
-        prompt = """
+SYSTEM_PROMPT = """
     You are an email parsing assistant.
 
     The user will send you RAW email text (headers, HTML, bodies, weird formatting)
@@ -89,12 +49,79 @@ def llm_extract_email(email_text: str) -> ExtractionResult:
 
     OUTPUT:
     Use the extract_booking tool.
-        """.strip()
+""".strip()
+
+# The model, system prompt and tool schema only change with a deploy, so their
+# part of the cache key is hashed once; each call only hashes the email text
+_PROMPT_PREFIX_DIGEST = prompt_digest(MODEL, SYSTEM_PROMPT, json.dumps(get_extract_booking_tool(), sort_keys=True))
+
+
+# Fallback formats for dates the LLM didn't return as ISO, tried in order
+_DATE_FORMATS = (
+    "%d/%m/%Y",           # 12/05/2026
+    "%m/%d/%Y",           # 05/12/2026
+    "%B %d, %Y",         # May 12, 2026
+    "%b %d, %Y",         # May 12, 2026
+    "%A, %B %d, %Y",    # Saturday, May 9, 2026
+    "%d %B %Y",          # 12 May 2026
+    "%d %b %Y",          # 12 May 2026
+    "%Y-%m-%dT%H:%M:%S", # 2026-05-12T00:00:00
+)
+
+
+def _normalize_date(date_str: str) -> str:
+    """Try to parse various date formats and return ISO format (YYYY-MM-DD)."""
+    if not date_str or date_str == "<UNKNOWN>":
+        return date_str
+
+    # Already ISO format
+    if len(date_str) == 10 and date_str[4] == "-" and date_str[7] == "-":
+        return date_str
+
+    date_str_stripped = date_str.strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str_stripped, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+
+    logfire.warning("Could not normalize date", date_str=date_str)
+    return date_str
+
+
+def _normalize_booking_dates(result: ExtractionResult) -> ExtractionResult:
+    """Normalize all date fields in an extraction result to ISO format."""
+    if not result.booking:
+        return result
+
+    b = result.booking
+    date_fields = ["check_in_date", "check_out_date", "booking_date"]
+    for field in date_fields:
+        val = getattr(b, field, None)
+        if val:
+            setattr(b, field, _normalize_date(val))
+
+    return result
+
+
+def llm_extract_email(email_text: str) -> ExtractionResult:
+    with _observability.maybe_span("llm_extract_email", email_length=len(email_text)):
+        tool = get_extract_booking_tool()
+
+        # Identical emails (resent confirmations, repeated blasts) reuse the earlier result
+        cache_key = prompt_hash(email_text, prefix=_PROMPT_PREFIX_DIGEST)
+        cached = get_cached_extraction(cache_key)
+        if cached is not None:
+            logfire.info("LLM cache hit", prompt_hash=cache_key)
+            return _EXTRACTION_ADAPTER.validate_python(cached)
 
+        # Forcing the tool makes Claude answer with only the schema-shaped tool input,
+        # so there is no free-text preamble to pay for or parse around.
         response = client.messages.create(
-            model="claude-haiku-4-5-20251001",
+            model=MODEL,
             max_tokens=4096,
-            system=prompt,
+            temperature=0,
+            system=SYSTEM_PROMPT,
             messages=[
                 {"role": "user", "content": email_text},
             ],
@@ -106,8 +133,10 @@ def llm_extract_email(email_text: str) -> ExtractionResult:
         # Extract tool use result from response content blocks
         for block in response.content:
             if block.type == "tool_use":
-                logfire.info("LLM tool_use", tool_input=block.input)
-                result = ExtractionResult(**block.input)
-                return _normalize_booking_dates(result)
+                if _observability.TRACE:
+                    logfire.info("LLM tool_use", tool_input=block.input)
+                result = _normalize_booking_dates(_EXTRACTION_ADAPTER.validate_python(block.input))
+                put_cached_extraction(cache_key, result.model_dump(mode="json"))
+                return result
 
         raise ValueError("No tool_use block found in Claude response")
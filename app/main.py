@@ -4,11 +4,11 @@ FastAPI application for travel booking and trip management.
 import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app import _observability
 from app.routers import bookings, cities, trips, export
 import logfire
 
-logfire.configure()
-logfire.instrument_pydantic()
+_observability.configure()
 
 app = FastAPI(
     title="Travel Booking API",
@@ -1,5 +1,6 @@
 import decimal
 from datetime import date
+from functools import lru_cache
 from pydantic import BaseModel, HttpUrl
 from typing import Optional, List
 
@@ -69,8 +70,9 @@ class City(BaseModel):
     city_id: str  # Format: "city_name,country" or "city_name,state,country"
 
 
+@lru_cache(maxsize=1)
 def get_extract_booking_tool():
-    """Return tool definition in Anthropic/Claude format."""
+    """Return tool definition in Anthropic/Claude format (schema built once)."""
     return {
         "name": "extract_booking",
         "description": "Extracts booking information from an email.",
@@ -1,40 +1,205 @@
 # app/parsers/booking.py
 from __future__ import annotations
 
-from email import message_from_string, policy
+import re
+from typing import Tuple
+from email import message_from_bytes, policy
+from email.errors import HeaderParseError
+from email.header import decode_header, make_header
+from email.parser import BytesHeaderParser
+from selectolax.lexbor import LexborHTMLParser
 from app.llm.extractors import llm_extract_email
 from app.models.booking import Booking, ExtractionResult
-import logfire
+from app._observability import maybe_span
 
+# Booking details sit near the top of the email; cap what we send to the LLM
+MAX_LLM_TEXT_CHARS = 16_000
 
-def _extract_html_from_email(msg) -> str:
-    """Return the HTML body if present; fallback to raw raw_email text."""
-    if msg.is_multipart():
-        for part in msg.walk():
-            if part.get_content_type() == "text/html":
-                payload = part.get_payload(decode=True) or b""
-                charset = part.get_content_charset() or "utf-8"
-                return payload.decode(charset, errors="replace")
-    else:
-        if msg.get_content_type() == "text/html":
-            payload = msg.get_payload(decode=True) or b""
-            charset = msg.get_content_charset() or "utf-8"
-            return payload.decode(charset, errors="replace")
+# compat32 skips building structured header objects (HeaderRegistry) for every
+# header; we only read Subject/From and the HTML part, which it handles fine
+_POLICY = policy.compat32
+_HEADER_PARSER = BytesHeaderParser(policy=_POLICY)
 
-    # Fallback – use the original raw email
-    return msg
+# Senders whose mail always goes to the LLM, matched on the From address domain
+# (subdomains included, e.g. hubcomms.premierinn.com)
+BOOKING_SENDER_DOMAINS = frozenset({
+    "premierinn.com",
+    "booking.com",
+    "expedia.com",
+    "hotels.com",
+    "airbnb.com",
+    "marriott.com",
+    "hilton.com",
+    "ihg.com",
+    "accor.com",
+    "travelodge.co.uk",
+    "trainline.com",
+    "lner.co.uk",
+    "gwr.com",
+    "eurostar.com",
+    "britishairways.com",
+    "ba.com",
+    "easyjet.com",
+    "ryanair.com",
+})
+
+_BOOKING_SUBJECT_RE = re.compile(
+    r"\b(?:confirm\w*|reserv\w*|book(?:ing|ed)|itinerary|e-?tickets?|receipt|check-?in)\b",
+    re.I,
+)
+_LINK_HOST_RE = re.compile(r"^https?://([^/?#\s]+)", re.I)
+# First blank line, with either LF or CRLF endings
+_HEADER_END_RE = re.compile(rb"\r?\n\r?\n")
+
+# MIME subtrees skipped while looking for the HTML body
+_BINARY_MAINTYPES = frozenset({"image", "application", "audio", "video"})
+
+
+def _parse_headers(raw_bytes: bytes):
+    """Parse only the top-level header block, leaving the MIME body untouched."""
+    # A single search that stops at the end of the headers; looking for each
+    # line-ending style separately scanned the whole body for the one not used
+    end = _HEADER_END_RE.search(raw_bytes)
+    header_block = raw_bytes[:end.start()] if end else raw_bytes
+    return _HEADER_PARSER.parsebytes(header_block)
+
+
+def _looks_like_booking(msg) -> bool:
+    """
+    Cheap header check run before the LLM call.
+
+    Returns True when the subject mentions a booking or the sender is a known
+    booking provider; only obvious non-booking mail (newsletters etc.) fails.
+    """
+    subject = str(msg.get("Subject", ""))
+    if "=?" in subject:
+        # compat32 leaves RFC 2047 encoded-words as-is
+        try:
+            subject = str(make_header(decode_header(subject)))
+        except (LookupError, UnicodeError, HeaderParseError):
+            # Unknown or broken charset label; keep the raw subject and let
+            # the sender allowlist decide
+            pass
+    if _BOOKING_SUBJECT_RE.search(subject):
+        return True
+
+    domain = str(msg.get("From", "")).rpartition("@")[2].strip(" >").lower()
+    labels = domain.split(".")
+    return any(".".join(labels[i:]) in BOOKING_SENDER_DOMAINS for i in range(len(labels) - 1))
+
+
+def _walk_text_parts(msg):
+    """Depth-first text/* parts, without descending into binary attachments."""
+    maintype = msg.get_content_maintype()
+    if maintype in _BINARY_MAINTYPES:
+        # Attachments never hold the body; don't descend into them
+        return
+    if maintype == "text":
+        yield msg
+    elif msg.is_multipart():
+        for part in msg.get_payload():
+            yield from _walk_text_parts(part)
+
+
+def _find_body_part(msg):
+    """The first text/html part, stopping at the first hit; else the first inline text/plain part."""
+    plain = None
+    for part in _walk_text_parts(msg):
+        subtype = part.get_content_subtype()
+        if subtype == "html":
+            return part
+        if plain is None and subtype == "plain" and part.get_content_disposition() != "attachment":
+            plain = part
+    return plain
+
+
+def _decode_part(part) -> str:
+    """Transfer-decoded payload of a MIME part as text, in its declared charset."""
+    payload = part.get_payload(decode=True) or b""
+    charset = part.get_content_charset() or "utf-8"
+    try:
+        return payload.decode(charset, errors="replace")
+    except LookupError:
+        # Unknown charset label in the email headers
+        return payload.decode("utf-8", errors="replace")
+
+
+def _extract_body_from_email(msg, raw_bytes: bytes = b"") -> Tuple[str, bool]:
+    """
+    Return (body, is_html): the HTML body, else the plain-text body.
+
+    Only a message with no text part at all falls back to the raw email.
+    """
+    part = _find_body_part(msg)
+    if part is not None:
+        return _decode_part(part), part.get_content_subtype() == "html"
+
+    # Fallback – use the original raw email; decoding the bytes we already have
+    # is cheaper than re-serializing the parsed message with as_string()
+    if raw_bytes:
+        return raw_bytes.decode("utf-8", errors="replace"), True
+    return msg.as_string(), True
+
+
+def _collapse_whitespace(text: str) -> str:
+    """Collapse space/tab/nbsp runs, trim every line and drop the empty ones."""
+    # One line-wise pass: split() does the collapsing and trimming. (A
+    # \s*\n\s* regex here backtracks quadratically on long whitespace runs
+    # with no newline in them.)
+    return "\n".join(filter(None, (" ".join(ln.split()) for ln in text.splitlines())))
+
+
+def _plain_to_text(body: str) -> str:
+    """Plain-text body for the LLM prompt: whitespace collapsed, capped at MAX_LLM_TEXT_CHARS."""
+    return _collapse_whitespace(body)[:MAX_LLM_TEXT_CHARS]
+
+
+def _html_to_text(html: str) -> str:
+    """
+    Reduce an HTML email to its visible text for the LLM prompt.
+
+    Styles, scripts and <head> are dropped, whitespace is collapsed and the
+    result is capped at MAX_LLM_TEXT_CHARS. Link hosts are appended so the
+    provider's website survives the loss of the href attributes.
+    """
+    tree = LexborHTMLParser(html)
+    for node in tree.css("style, script, head"):
+        node.decompose()
+
+    root = tree.body or tree.root
+    text = root.text(separator="\n", strip=True, skip_empty=True) if root is not None else ""
+    text = _collapse_whitespace(text)
+
+    # The links line would be cut off by the cap anyway, so only collect it when it fits
+    if len(text) < MAX_LLM_TEXT_CHARS:
+        # dict keeps first-seen order with O(1) de-duplication
+        hosts = {}
+        for node in tree.css("a[href]"):
+            match = _LINK_HOST_RE.match(node.attributes.get("href") or "")
+            if match:
+                hosts.setdefault(match.group(1))
+        if hosts:
+            text += "\n\nLinks: " + ", ".join(hosts)
+
+    return text[:MAX_LLM_TEXT_CHARS]
 
 
 def parse_email(raw_bytes: bytes) -> Booking:
-    from email import message_from_bytes, policy
-    with logfire.span("parse_email", email_size_raw=len(raw_bytes)):
-        raw_email = message_from_bytes(raw_bytes, policy=policy.default)
+    with maybe_span("parse_email", email_size_raw=len(raw_bytes)):
+        # Header-only fast path: non-booking mail never pays for the full MIME parse
+        if not _looks_like_booking(_parse_headers(raw_bytes)):
+            raise ValueError("pre-filter: non-booking")
+
+        raw_email = message_from_bytes(raw_bytes, policy=_POLICY)
+
+        with maybe_span("extract_body_from_email"):
+            body, is_html = _extract_body_from_email(raw_email, raw_bytes)
 
-        with logfire.span("extract_html_from_email"):
-            html = _extract_html_from_email(raw_email)
+        with maybe_span("body_to_text", body_length=len(body), is_html=is_html):
+            text = _html_to_text(body) if is_html else _plain_to_text(body)
 
-        with logfire.span("llm_extract_booking"):
-            result: ExtractionResult = llm_extract_email(html)
+        with maybe_span("llm_extract_booking"):
+            result: ExtractionResult = llm_extract_email(text)
 
         if result.kind == "marketing" or result.booking is None:
             raise ValueError("Email is not a booking or could not be parsed as one.")
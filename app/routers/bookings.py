@@ -2,20 +2,25 @@
 FastAPI router for booking endpoints.
 """
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import iterate_in_threadpool
 from typing import Optional, List
-from app.schemas.booking import BookingResponse, BookingUpdateRequest, BookingsListResponse
-from app.services.dynamodb_service import DynamoDBService
+from app.schemas.booking import BOOKING_RESPONSE_LIST, BookingResponse, BookingUpdateRequest, BookingsListResponse
+from app.services.dynamodb_service import get_db_service
 from app.functions.common import store_result
 from pydantic import BaseModel
 import os
 import logfire
 
 router = APIRouter(prefix="/bookings", tags=["bookings"])
-db_service = DynamoDBService()
+db_service = get_db_service()
+
+# Only read the attributes the API returns
+BOOKING_RESPONSE_FIELDS = list(BookingResponse.model_fields)
 
 
 @router.get("/{confirmation}", response_model=BookingResponse)
-async def get_booking_by_id(confirmation: str):
+def get_booking_by_id(confirmation: str):
     """
     Get a booking by confirmation ID.
     
@@ -26,7 +31,7 @@ async def get_booking_by_id(confirmation: str):
         Booking details
     """
     with logfire.span("get_booking_by_id", confirmation=confirmation):
-        booking = db_service.get_booking_by_id(confirmation)
+        booking = db_service.get_booking_by_id(confirmation, fields=BOOKING_RESPONSE_FIELDS)
         
         if not booking:
             raise HTTPException(
@@ -38,7 +43,7 @@ async def get_booking_by_id(confirmation: str):
 
 
 @router.get("/", response_model=BookingsListResponse)
-async def get_bookings_by_date_range(
+def get_bookings_by_date_range(
     start_date: Optional[str] = Query(
         None,
         description="Start date for filtering (ISO format: YYYY-MM-DD or full date string)",
@@ -50,7 +55,11 @@ async def get_bookings_by_date_range(
     date_field: str = Query(
         "check_in_date",
         description="Date field to filter on (check_in_date, check_out_date, booking_date, created_at)",
-    )
+    ),
+    stream: bool = Query(
+        False,
+        description="Stream bookings as NDJSON (one booking per line) instead of a single JSON body",
+    ),
 ):
     """
     Get bookings within a date range.
@@ -61,10 +70,26 @@ async def get_bookings_by_date_range(
         start_date: Start date for filtering
         end_date: End date for filtering
         date_field: Field to filter on (check_in_date, check_out_date, booking_date, created_at)
+        stream: Return application/x-ndjson, written page by page as DynamoDB returns it
         
     Returns:
         List of bookings matching the date range
     """
+    if stream:
+        bookings = db_service.iter_bookings_by_date_range(
+            start_date=start_date,
+            end_date=end_date,
+            date_field=date_field,
+            fields=BOOKING_RESPONSE_FIELDS,
+        )
+        lines = _ndjson_lines(
+            bookings,
+            start_date=start_date,
+            end_date=end_date,
+            date_field=date_field,
+        )
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+
     with logfire.span(
         "get_bookings_by_date_range",
         start_date=start_date,
@@ -74,11 +99,11 @@ async def get_bookings_by_date_range(
         bookings = db_service.get_bookings_by_date_range(
             start_date=start_date,
             end_date=end_date,
-            date_field=date_field
+            date_field=date_field,
+            fields=BOOKING_RESPONSE_FIELDS,
         )
         
-        # Convert to response models
-        booking_responses = [BookingResponse(**booking) for booking in bookings]
+        booking_responses = BOOKING_RESPONSE_LIST.validate_python(bookings)
         
         return BookingsListResponse(
             bookings=booking_responses,
@@ -86,6 +111,18 @@ async def get_bookings_by_date_range(
         )
 
 
+async def _ndjson_lines(bookings, **span_attributes):
+    """One validated BookingResponse JSON document per line."""
+    # The span lives in the generator: DynamoDB is only read while the
+    # response body is being sent, after the endpoint has returned. An async
+    # generator runs every step in the response task's context, so the span is
+    # entered and exited in the same one; the blocking DynamoDB pages are
+    # pulled on the threadpool.
+    with logfire.span("get_bookings_by_date_range", stream=True, **span_attributes):
+        async for booking in iterate_in_threadpool(bookings):
+            yield BookingResponse.model_validate(booking).model_dump_json() + "\n"
+
+
 class BookingForStorage(BaseModel):
     """Booking fields for DynamoDB storage. All optional for partial updates."""
     confirmation: str
@@ -122,7 +159,7 @@ class BookingForStorage(BaseModel):
 
 
 @router.put("/{confirmation}", response_model=BookingResponse)
-async def update_booking(confirmation: str, body: BookingUpdateRequest):
+def update_booking(confirmation: str, body: BookingUpdateRequest):
     """Update a booking by confirmation ID. Only provided fields are updated."""
     with logfire.span("update_booking", confirmation=confirmation):
         existing = db_service.get_booking_by_id(confirmation)
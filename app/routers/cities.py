@@ -6,14 +6,14 @@ from typing import Optional, List, Dict, Any
 from decimal import Decimal
 from app.models.booking import City, Visit
 from app.schemas.booking import CityResponse, CitiesListResponse, VisitResponse
-from app.services.dynamodb_service import DynamoDBService
+from app.services.dynamodb_service import get_db_service
 from app.functions.common import store_result, normalize_booking_data
 from app.functions.geocoding import geocode_address
 import os
 import logfire
 
 router = APIRouter(prefix="/cities", tags=["cities"])
-db_service = DynamoDBService()
+db_service = get_db_service()
 
 
 def _create_city_id(city_name: str, country: str, state: Optional[str] = None) -> str:
@@ -50,7 +50,7 @@ def _city_data_to_response(city_data: Dict[str, Any]) -> CityResponse:
     )
 
 
-def _store_city(city: City, city_id: str):
+def _store_city(city: City, city_id: str, expect_new: bool = False):
     """Store a city in DynamoDB."""
     from app.functions.api_city import CityForStorage
     city_dict = city.model_dump(mode="json")
@@ -61,11 +61,11 @@ def _store_city(city: City, city_id: str):
         ]
     city_storage = CityForStorage(**city_dict)
     table_name = os.environ.get("BOOKINGS_TABLE_NAME", "bookings")
-    store_result(city_storage, table_name, {"confirmation": city_id})
+    store_result(city_storage, table_name, {"confirmation": city_id}, expect_new=expect_new)
 
 
 @router.get("/", response_model=CitiesListResponse)
-async def list_cities(
+def list_cities(
     trip: Optional[str] = Query(None, description="Filter by trip name"),
 ):
     """List all cities, optionally filtered by trip name."""
@@ -80,7 +80,7 @@ async def list_cities(
 
 
 @router.get("/{city_id}", response_model=CityResponse)
-async def get_city(city_id: str):
+def get_city(city_id: str):
     """Get a city by its ID."""
     with logfire.span("get_city", city_id=city_id):
         city_data = db_service.get_booking_by_id(city_id)
@@ -90,7 +90,7 @@ async def get_city(city_id: str):
 
 
 @router.post("/", response_model=CityResponse, status_code=201)
-async def create_city(
+def create_city(
     city_name: str = Query(..., description="City name"),
     country: str = Query(..., description="Country"),
     state: Optional[str] = Query(None, description="State/province"),
@@ -118,12 +118,12 @@ async def create_city(
             city_data["location_name"] = geocode_result.get("location", "")
 
         city = City(**city_data)
-        _store_city(city, city_id)
+        _store_city(city, city_id, expect_new=True)
         return _city_data_to_response(city.model_dump(mode="json"))
 
 
 @router.put("/{city_id}", response_model=CityResponse)
-async def update_city(
+def update_city(
     city_id: str,
     city_name: Optional[str] = Query(None),
     country: Optional[str] = Query(None),
@@ -170,7 +170,7 @@ async def update_city(
 
 
 @router.post("/{city_id}/visits", response_model=CityResponse)
-async def add_visit(
+def add_visit(
     city_id: str,
     start_date: Optional[str] = Query(None, description="Visit start date"),
     end_date: Optional[str] = Query(None, description="Visit end date"),
@@ -201,7 +201,7 @@ async def add_visit(
 
 
 @router.put("/{city_id}/visits", response_model=CityResponse)
-async def update_visit(
+def update_visit(
     city_id: str,
     visit_index: int = Query(..., description="Index of the visit to update (0-based)"),
     start_date: Optional[str] = Query(None),
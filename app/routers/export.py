@@ -5,13 +5,14 @@ from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import PlainTextResponse
 from typing import Optional
 from datetime import datetime
+from collections import OrderedDict
 from app.schemas.booking import ObsidianTripExport, ObsidianTripNote, ObsidianBookingNote, BookingResponse
 from app.routers.cities import _city_data_to_response
-from app.services.dynamodb_service import DynamoDBService
+from app.services.dynamodb_service import get_db_service
 import logfire
 
 router = APIRouter(prefix="/export", tags=["export"])
-db_service = DynamoDBService()
+db_service = get_db_service()
 
 
 def _booking_to_markdown(booking: dict) -> ObsidianBookingNote:
@@ -130,9 +131,8 @@ def _city_to_markdown(city_data: dict, trip_name: Optional[str] = None) -> Obsid
 def _format_date_range(start: str, end: str) -> str:
     """Format date range for display, e.g. 'December 6 - 9' or 'December 28 - January 2'."""
     try:
-        from datetime import datetime as dt
-        s = dt.strptime(start, "%Y-%m-%d")
-        e = dt.strptime(end, "%Y-%m-%d")
+        s = datetime.strptime(start, "%Y-%m-%d")
+        e = datetime.strptime(end, "%Y-%m-%d")
         if s.month == e.month:
             return f"{s.strftime('%B')} {s.day} - {e.day}"
         return f"{s.strftime('%B')} {s.day} - {e.strftime('%B')} {e.day}"
@@ -143,8 +143,7 @@ def _format_date_range(start: str, end: str) -> str:
 def _format_date_with_day(date_str: str) -> str:
     """Format a date as 'Friday May 9'."""
     try:
-        from datetime import datetime as dt
-        d = dt.strptime(date_str, "%Y-%m-%d")
+        d = datetime.strptime(date_str, "%Y-%m-%d")
         return f"{d.strftime('%A')} {d.strftime('%B')} {d.day}"
     except (ValueError, TypeError):
         return date_str
@@ -255,14 +254,26 @@ def _format_departure_lines(b: dict) -> list:
     return lines
 
 
-def _match_transit_arrival(transit_bookings: list, city_name: str, arrival_date: str) -> list:
+def _transit_with_cities(transit_bookings: list) -> list:
+    """Pair each transit booking with its cleaned, lowercased (arrival, departure, city) names."""
+    return [
+        (
+            b,
+            _clean(b.get("arrival_city", "")).lower(),
+            _clean(b.get("departure_city", "")).lower(),
+            _clean(b.get("city", "")).lower(),
+        )
+        for b in transit_bookings
+    ]
+
+
+def _match_transit_arrival(transit_cities: list, city_name: str, arrival_date: str) -> list:
     """Find transit bookings arriving at this city on this date."""
     if not arrival_date:
         return []
     name_lower = city_name.lower()
     matched = []
-    for b in transit_bookings:
-        arr_city = _clean(b.get("arrival_city", "")).lower()
+    for b, arr_city, _, b_city in transit_cities:
         dep_date = b.get("check_in_date", "")
         out_date = b.get("check_out_date", "")
         # Match by arrival_city + date, or by check_out_date (arrival date) matching visit start
@@ -270,34 +281,31 @@ def _match_transit_arrival(transit_bookings: list, city_name: str, arrival_date:
             matched.append(b)
         elif not arr_city and out_date == arrival_date:
             # Fallback: no arrival_city set, but arrival date matches
-            b_city = _clean(b.get("city", "")).lower()
             if b_city != name_lower:
                 # city field is departure city, this is arriving somewhere else — could be us
                 matched.append(b)
     return matched
 
 
-def _match_transit_departure(transit_bookings: list, city_name: str, departure_date: str) -> list:
+def _match_transit_departure(transit_cities: list, city_name: str, departure_date: str) -> list:
     """Find transit bookings departing from this city on this date."""
     if not departure_date:
         return []
     name_lower = city_name.lower()
     matched = []
-    for b in transit_bookings:
-        dep_city = _clean(b.get("departure_city", "")).lower()
+    for b, _, dep_city, b_city in transit_cities:
         dep_date = b.get("check_in_date", "")
         if dep_city == name_lower and dep_date == departure_date:
             matched.append(b)
         elif not dep_city:
             # Fallback: no departure_city, use city field
-            b_city = _clean(b.get("city", "")).lower()
             if b_city == name_lower and dep_date == departure_date:
                 matched.append(b)
     return matched
 
 
 @router.get("/obsidian/trip-note/{trip_name}", response_model=ObsidianTripNote)
-async def export_trip_note_for_obsidian(trip_name: str):
+def export_trip_note_for_obsidian(trip_name: str):
     """
     Export a trip as a single consolidated Obsidian markdown note.
     City-centric itinerary format with Arrival/Hotel/Departure per city visit.
@@ -307,16 +315,25 @@ async def export_trip_note_for_obsidian(trip_name: str):
         if not cities:
             raise HTTPException(status_code=404, detail=f"No cities found for trip: {trip_name}")
 
-        # Get trip date range for booking lookup
+        # One pass over the visits: trip date range for the booking lookup and
+        # the flat visit list for the itinerary
         start_dates = []
         end_dates = []
+        visit_list = []
         for city in cities:
+            city_name = city.get("city_name", "")
             for visit in (city.get("visits") or []):
                 if visit.get("trip") == trip_name:
                     if visit.get("start_date"):
                         start_dates.append(visit["start_date"])
                     if visit.get("end_date"):
                         end_dates.append(visit["end_date"])
+                    visit_list.append({
+                        "city_name": city_name,
+                        "start_date": visit.get("start_date") or "",
+                        "end_date": visit.get("end_date") or "",
+                    })
+        visit_list.sort(key=lambda x: x["start_date"] or "9999")
 
         # Fetch bookings in the trip date range
         bookings = []
@@ -329,30 +346,26 @@ async def export_trip_note_for_obsidian(trip_name: str):
                 date_field="check_in_date",
             )
 
-        # Separate bookings by type
-        hotel_bookings = [b for b in bookings if b.get("booking_type", "hotel") not in ("train", "flight")]
-        transit_bookings = [b for b in bookings if b.get("booking_type") in ("train", "flight")]
-
-        # Build flat visit list sorted by start_date
-        visit_list = []
-        for city in cities:
-            city_name = city.get("city_name", "")
-            for v in (city.get("visits") or []):
-                if v.get("trip") == trip_name:
-                    visit_list.append({
-                        "city_name": city_name,
-                        "start_date": v.get("start_date") or "",
-                        "end_date": v.get("end_date") or "",
-                    })
-        visit_list.sort(key=lambda x: x["start_date"] or "9999")
+        # Separate bookings by type in one pass; hotels are also indexed by city
+        # so each visit only looks at its own city's bookings
+        hotel_bookings = []
+        transit_bookings = []
+        hotels_by_city = {}
+        for b in bookings:
+            if b.get("booking_type") in ("train", "flight"):
+                transit_bookings.append(b)
+            else:
+                hotel_bookings.append(b)
+                hotels_by_city.setdefault(_clean(b.get("city", "")).lower(), []).append(b)
+        # City names are cleaned and lowercased once, not once per visit
+        transit_cities = _transit_with_cities(transit_bookings)
 
         # Count days
         total_days = 0
         if start_dates and end_dates:
             try:
-                from datetime import datetime as dt
-                s = dt.strptime(min(start_dates), "%Y-%m-%d")
-                e = dt.strptime(max(end_dates), "%Y-%m-%d")
+                s = datetime.strptime(min(start_dates), "%Y-%m-%d")
+                e = datetime.strptime(max(end_dates), "%Y-%m-%d")
                 total_days = (e - s).days
             except (ValueError, TypeError):
                 pass
@@ -381,7 +394,6 @@ async def export_trip_note_for_obsidian(trip_name: str):
         used_transit_ids = set()
 
         # Group visits by city name (preserving order of first appearance)
-        from collections import OrderedDict
         city_visits = OrderedDict()
         for visit in visit_list:
             cn = visit["city_name"]
@@ -391,6 +403,7 @@ async def export_trip_note_for_obsidian(trip_name: str):
 
         # City-centric itinerary
         for city_name, visits in city_visits.items():
+            city_lower = city_name.lower()
             lines.append("")
             lines.append(f"# {city_name}")
 
@@ -412,7 +425,7 @@ async def export_trip_note_for_obsidian(trip_name: str):
                 v_end = v["end_date"]
 
                 # Arrival
-                arrivals = _match_transit_arrival(transit_bookings, city_name, v_start)
+                arrivals = _match_transit_arrival(transit_cities, city_name, v_start)
                 if arrivals:
                     date_label = _format_date_with_day(v_start) if v_start else ""
                     lines.append(f"## Arrival - {date_label}" if date_label else "## Arrival")
@@ -426,9 +439,8 @@ async def export_trip_note_for_obsidian(trip_name: str):
 
                 # Hotel
                 city_hotels = [
-                    b for b in hotel_bookings
-                    if (_clean(b.get("city", "")).lower() == city_name.lower()
-                        and b.get("check_in_date", "") >= v_start
+                    b for b in hotels_by_city.get(city_lower, [])
+                    if (b.get("check_in_date", "") >= v_start
                         and b.get("check_in_date", "") <= (v_end or "9999")
                         and b.get("confirmation") not in used_hotel_ids)
                 ]
@@ -439,7 +451,7 @@ async def export_trip_note_for_obsidian(trip_name: str):
                     lines.extend(_format_hotel_lines(b))
 
                 # Departure
-                departures = _match_transit_departure(transit_bookings, city_name, v_end)
+                departures = _match_transit_departure(transit_cities, city_name, v_end)
                 if departures:
                     date_label = _format_date_with_day(v_end) if v_end else ""
                     lines.append(f"## Departure - {date_label}" if date_label else "## Departure")
@@ -475,7 +487,7 @@ async def export_trip_note_for_obsidian(trip_name: str):
 
 
 @router.get("/obsidian/trips/{trip_name}", response_model=ObsidianTripExport)
-async def export_trip_for_obsidian(trip_name: str):
+def export_trip_for_obsidian(trip_name: str):
     """
     Export a trip as Obsidian-compatible markdown notes with YAML frontmatter.
     Returns an overview note and individual booking/city notes.
@@ -553,7 +565,7 @@ async def export_trip_for_obsidian(trip_name: str):
 
 
 @router.get("/obsidian/bookings", response_model=list[ObsidianBookingNote])
-async def export_bookings_for_obsidian(
+def export_bookings_for_obsidian(
     start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
 ):
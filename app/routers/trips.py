@@ -1,10 +1,12 @@
 """
 FastAPI router for trip aggregation endpoints.
 """
+import os
 from fastapi import APIRouter, HTTPException
 from typing import Optional
 from decimal import Decimal
 from app.schemas.booking import (
+    BOOKING_RESPONSE_LIST,
     TripResponse,
     TripsListResponse,
     BookingResponse,
@@ -14,12 +16,12 @@ from app.schemas.booking import (
 )
 from app.routers.cities import _city_data_to_response, _create_city_id, _geocode_city, _store_city
 from app.models.booking import City, Visit
-from app.services.dynamodb_service import DynamoDBService
+from app.services.dynamodb_service import get_db_service
 from app.functions.common import normalize_booking_data
 import logfire
 
 router = APIRouter(prefix="/trips", tags=["trips"])
-db_service = DynamoDBService()
+db_service = get_db_service()
 
 
 def _match_bookings_to_city(city_name: str, all_bookings: list) -> list:
@@ -32,7 +34,7 @@ def _match_bookings_to_city(city_name: str, all_bookings: list) -> list:
 
 
 @router.get("/", response_model=TripsListResponse)
-async def list_trips():
+def list_trips():
     """List all unique trip names."""
     with logfire.span("list_trips"):
         trip_names = db_service.get_all_trip_names()
@@ -40,7 +42,7 @@ async def list_trips():
 
 
 @router.get("/{trip_name}", response_model=TripResponse)
-async def get_trip(trip_name: str):
+def get_trip(trip_name: str):
     """Get aggregated trip data: cities with their visits and bookings within the trip date range."""
     with logfire.span("get_trip", trip_name=trip_name):
         cities = db_service.get_cities_by_trip(trip_name)
@@ -69,7 +71,7 @@ async def get_trip(trip_name: str):
                     end_date=max_end,
                     date_field="check_in_date",
                 )
-                booking_responses = [BookingResponse(**b) for b in bookings]
+                booking_responses = BOOKING_RESPONSE_LIST.validate_python(bookings)
 
         return TripResponse(
             trip_name=trip_name,
@@ -79,7 +81,7 @@ async def get_trip(trip_name: str):
 
 
 @router.post("/preview", response_model=TripPreviewResponse)
-async def preview_trip(request: CreateTripRequest):
+def preview_trip(request: CreateTripRequest):
     """
     Preview a trip before creating it. For each city, auto-suggests visit dates
     by matching bookings whose city field matches the city name.
@@ -119,14 +121,13 @@ async def preview_trip(request: CreateTripRequest):
 
 
 @router.post("/create", response_model=TripResponse)
-async def create_trip(request: CreateTripRequest):
+def create_trip(request: CreateTripRequest):
     """
     Create a trip by creating cities (if needed) and adding visits.
     Dates are auto-assigned from matching bookings if not provided.
     """
     with logfire.span("create_trip", trip_name=request.trip_name):
         all_bookings = db_service.get_all_bookings()
-        import os
 
         for city_input in request.cities:
             city_id = _create_city_id(city_input.city_name, city_input.country, city_input.state)
@@ -183,7 +184,7 @@ async def create_trip(request: CreateTripRequest):
                     city_data["location_name"] = geocode_result.get("location", "")
 
                 city = City(**city_data)
-                _store_city(city, city_id)
+                _store_city(city, city_id, expect_new=True)
 
         # Return the full trip — use direct query since cities may not have dates yet
         cities = db_service.get_cities_by_trip(request.trip_name)
@@ -222,7 +223,7 @@ def _cluster_bookings(bookings: list) -> list:
 
 
 @router.post("/{trip_name}/auto-assign", response_model=TripResponse)
-async def auto_assign_dates(trip_name: str):
+def auto_assign_dates(trip_name: str):
     """
     Auto-assign visit dates for a trip by matching bookings to cities by name.
     Creates one visit per booking cluster (non-contiguous date ranges become separate visits).
@@ -264,14 +265,8 @@ async def auto_assign_dates(trip_name: str):
             dateless_visits = [(i, v) for i, v in trip_visits if not v.start_date or not v.end_date]
 
             # Exclude clusters that are already covered by existing dated visits
-            uncovered_clusters = []
-            for c_start, c_end in clusters:
-                already_covered = any(
-                    v.start_date == c_start and v.end_date == c_end
-                    for _, v in dated_visits
-                )
-                if not already_covered:
-                    uncovered_clusters.append((c_start, c_end))
+            covered = {(v.start_date, v.end_date) for _, v in dated_visits}
+            uncovered_clusters = [c for c in clusters if c not in covered]
 
             if not uncovered_clusters:
                 continue
@@ -296,4 +291,4 @@ async def auto_assign_dates(trip_name: str):
                 updated_count += 1
 
         logfire.info("auto_assign_dates complete", trip_name=trip_name, updated=updated_count)
-        return await get_trip(trip_name)
+        return get_trip(trip_name)
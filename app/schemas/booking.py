@@ -1,7 +1,7 @@
 """
 Pydantic schemas for API responses.
 """
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 from typing import Optional, List
 
 
@@ -76,6 +76,12 @@ class BookingUpdateRequest(BaseModel):
     room_type: Optional[str] = None
 
 
+# Validates a whole page of DynamoDB items in one call. FastAPI does not
+# re-validate model instances returned from an endpoint, so list responses are
+# built from this rather than from model_construct.
+BOOKING_RESPONSE_LIST = TypeAdapter(list[BookingResponse])
+
+
 class BookingsListResponse(BaseModel):
     """Response schema for list of bookings."""
     bookings: list[BookingResponse]
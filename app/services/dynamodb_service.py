@@ -2,27 +2,42 @@
 Service for querying DynamoDB bookings table.
 """
 import os
-import boto3
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Attr, Key
 from botocore.exceptions import ClientError
-from typing import Optional, List, Dict, Any
+from typing import Optional, Iterator, List, Dict, Any
 from datetime import datetime
+from decimal import Decimal
+from app.functions.aws import get_resource
+from app.functions.common import month_partition
 import logfire
 
+# Full-table scans are split into this many segments read in parallel
+SCAN_SEGMENTS = int(os.environ.get("DYNAMODB_SCAN_SEGMENTS", "4"))
+
 
 class DynamoDBService:
     """Service for interacting with DynamoDB bookings table."""
     
     def __init__(self):
         self.table_name = os.environ.get("BOOKINGS_TABLE_NAME", "bookings")
-        self.dynamodb = boto3.resource("dynamodb")
+        self.dynamodb = get_resource("dynamodb")
         self.table = self.dynamodb.Table(self.table_name)
+        # GSI on (check_in_month, check_in_date); only set once existing rows carry check_in_month
+        self.date_index_name = os.environ.get("BOOKINGS_DATE_INDEX_NAME")
     
-    def get_booking_by_id(self, confirmation: str) -> Optional[Dict[str, Any]]:
+    def get_booking_by_id(
+        self,
+        confirmation: str,
+        fields: Optional[List[str]] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Get a single booking by confirmation ID.
         
         Args:
             confirmation: The booking confirmation ID
+            fields: Attributes to return (default: the whole item)
             
         Returns:
             Booking item as dict, or None if not found
@@ -30,7 +45,8 @@ class DynamoDBService:
         try:
             with logfire.span("dynamodb_get_item", confirmation=confirmation):
                 response = self.table.get_item(
-                    Key={"confirmation": confirmation}
+                    Key={"confirmation": confirmation},
+                    **_projection(fields)
                 )
                 
                 if "Item" in response:
@@ -47,18 +63,20 @@ class DynamoDBService:
         self, 
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
-        date_field: str = "check_in_date"
+        date_field: str = "check_in_date",
+        fields: Optional[List[str]] = None
     ) -> List[Dict[str, Any]]:
         """
-        Get bookings within a date range by scanning the table.
+        Get bookings within a date range.
         
-        Note: This uses a scan operation which can be slow for large tables.
-        For better performance, consider adding a GSI on the date field.
+        Closed check_in_date ranges are read from the check-in date GSI when
+        BOOKINGS_DATE_INDEX_NAME is set; everything else falls back to a scan.
         
         Args:
             start_date: Start date (ISO format string, e.g., "2025-11-17")
             end_date: End date (ISO format string, e.g., "2025-11-20")
             date_field: Field to filter on (default: "check_in_date")
+            fields: Attributes to return (default: the whole item)
             
         Returns:
             List of booking items
@@ -68,52 +86,92 @@ class DynamoDBService:
                              start_date=start_date,
                              end_date=end_date,
                              date_field=date_field):
-                # Build filter expression
-                # Always exclude city records (they have city_id attribute)
-                filter_expressions = ["attribute_not_exists(city_id)"]
-                expression_attribute_names = {}
-                expression_attribute_values = {}
-
-                if start_date:
-                    filter_expressions.append(f"#{date_field} >= :start_date")
-                    expression_attribute_names[f"#{date_field}"] = date_field
-                    expression_attribute_values[":start_date"] = start_date
-                
-                if end_date:
-                    filter_expressions.append(f"#{date_field} <= :end_date")
-                    expression_attribute_names[f"#{date_field}"] = date_field
-                    expression_attribute_values[":end_date"] = end_date
-                
-                # Scan parameters
-                scan_kwargs = {}
-                if filter_expressions:
-                    scan_kwargs["FilterExpression"] = " AND ".join(filter_expressions)
-                    if expression_attribute_names:
-                        scan_kwargs["ExpressionAttributeNames"] = expression_attribute_names
-                    if expression_attribute_values:
-                        scan_kwargs["ExpressionAttributeValues"] = expression_attribute_values
-                
-                # Perform scan (with pagination)
-                all_items = []
-                response = self.table.scan(**scan_kwargs)
-                all_items.extend(response.get("Items", []))
-                
-                # Handle pagination
-                while "LastEvaluatedKey" in response:
-                    scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
-                    response = self.table.scan(**scan_kwargs)
-                    all_items.extend(response.get("Items", []))
-                
-                # Convert DynamoDB items to regular dicts
-                return [self._convert_dynamodb_item(item) for item in all_items]
-                
+                if self._uses_date_index(start_date, end_date, date_field):
+                    return list(self.iter_bookings_by_date_range(start_date, end_date, date_field, fields))
+                return self._parallel_scan(
+                    FilterExpression=_date_range_condition(start_date, end_date, date_field),
+                    **_projection(fields)
+                )
+
         except ClientError as e:
             logfire.error("Error scanning bookings from DynamoDB", 
                          error=str(e),
                          start_date=start_date,
                          end_date=end_date)
             raise
-    
+
+    def iter_bookings_by_date_range(
+        self,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        date_field: str = "check_in_date",
+        fields: Optional[List[str]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield bookings within a date range one page at a time.
+
+        Same lookup as get_bookings_by_date_range without buffering the full
+        result; nothing is read until the iterator is consumed.
+        """
+        if self._uses_date_index(start_date, end_date, date_field):
+            # One Query per month partition of the check-in date GSI
+            for month in _months_between(start_date, end_date):
+                yield from self._paginate(
+                    self.table.query,
+                    IndexName=self.date_index_name,
+                    KeyConditionExpression=(
+                        Key("check_in_month").eq(month)
+                        & Key("check_in_date").between(start_date, end_date)
+                    ),
+                    **_projection(fields)
+                )
+            return
+
+        yield from self._paginate(
+            self.table.scan,
+            FilterExpression=_date_range_condition(start_date, end_date, date_field),
+            **_projection(fields)
+        )
+
+    def _uses_date_index(self, start_date, end_date, date_field) -> bool:
+        """Closed ISO check_in_date ranges can be served by the GSI, if one is configured."""
+        return bool(
+            self.date_index_name and date_field == "check_in_date"
+            and month_partition(start_date) and month_partition(end_date)
+        )
+
+    def _paginate(self, operation, **kwargs) -> Iterator[Dict[str, Any]]:
+        """Yield converted items from a Table scan/query, following LastEvaluatedKey."""
+        while True:
+            response = operation(**kwargs)
+            for item in response.get("Items", []):
+                yield self._convert_dynamodb_item(item)
+            if "LastEvaluatedKey" not in response:
+                return
+            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    def _parallel_scan(self, segments: int = SCAN_SEGMENTS, **scan_kwargs) -> List[Dict[str, Any]]:
+        """
+        Scan the whole table as parallel segments and return every item.
+
+        Each segment paginates on its own thread through its own Table object;
+        the underlying low-level client is shared and thread-safe.
+        """
+        if segments <= 1:
+            return list(self._paginate(self.table.scan, **scan_kwargs))
+
+        def scan_segment(segment: int) -> List[Dict[str, Any]]:
+            table = self.dynamodb.Table(self.table_name)
+            return list(self._paginate(
+                table.scan, Segment=segment, TotalSegments=segments, **scan_kwargs
+            ))
+
+        items = []
+        with ThreadPoolExecutor(max_workers=segments) as executor:
+            for segment_items in executor.map(scan_segment, range(segments)):
+                items.extend(segment_items)
+        return items
+
     def get_all_cities(self) -> List[Dict[str, Any]]:
         """
         Get all city items from DynamoDB.
@@ -121,19 +179,7 @@ class DynamoDBService:
         """
         try:
             with logfire.span("dynamodb_scan_cities"):
-                scan_kwargs = {
-                    "FilterExpression": "attribute_exists(city_id)",
-                }
-                all_items = []
-                response = self.table.scan(**scan_kwargs)
-                all_items.extend(response.get("Items", []))
-
-                while "LastEvaluatedKey" in response:
-                    scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
-                    response = self.table.scan(**scan_kwargs)
-                    all_items.extend(response.get("Items", []))
-
-                return [self._convert_dynamodb_item(item) for item in all_items]
+                return self._parallel_scan(FilterExpression=Attr("city_id").exists())
 
         except ClientError as e:
             logfire.error("Error scanning cities from DynamoDB", error=str(e))
@@ -146,19 +192,9 @@ class DynamoDBService:
         """
         try:
             with logfire.span("dynamodb_scan_bookings"):
-                scan_kwargs = {
-                    "FilterExpression": "attribute_exists(guest_name) AND attribute_not_exists(city_id)",
-                }
-                all_items = []
-                response = self.table.scan(**scan_kwargs)
-                all_items.extend(response.get("Items", []))
-
-                while "LastEvaluatedKey" in response:
-                    scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
-                    response = self.table.scan(**scan_kwargs)
-                    all_items.extend(response.get("Items", []))
-
-                return [self._convert_dynamodb_item(item) for item in all_items]
+                return self._parallel_scan(
+                    FilterExpression=Attr("guest_name").exists() & Attr("city_id").not_exists(),
+                )
 
         except ClientError as e:
             logfire.error("Error scanning bookings from DynamoDB", error=str(e))
@@ -187,30 +223,54 @@ class DynamoDBService:
 
     def _convert_dynamodb_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Convert DynamoDB item format to regular Python dict.
+        Convert a DynamoDB item to a JSON-friendly dict.
 
-        boto3 resource API returns native Python types, but we handle both formats
-        in case we switch to low-level client API. Decimal values are converted
-        to float/int for JSON serialization compatibility.
+        The Table resource already deserializes to native Python types, so the
+        only conversion left is Decimal -> str for numbers.
         """
-        from decimal import Decimal
-        converted = {}
-        for key, value in item.items():
-            if isinstance(value, Decimal):
-                converted[key] = str(value)
-            elif isinstance(value, dict):
-                # DynamoDB type descriptor (low-level API format)
-                if "S" in value:
-                    converted[key] = value["S"]
-                elif "N" in value:
-                    converted[key] = value["N"]
-                elif "BOOL" in value:
-                    converted[key] = value["BOOL"]
-                elif "NULL" in value:
-                    converted[key] = None
-                else:
-                    converted[key] = value
-            else:
-                converted[key] = value
-        return converted
+        return {
+            key: str(value) if isinstance(value, Decimal) else value
+            for key, value in item.items()
+        }
+
+
+@lru_cache(maxsize=1)
+def get_db_service() -> DynamoDBService:
+    """Return the DynamoDBService shared by every router."""
+    return DynamoDBService()
+
+
+def _projection(fields: Optional[List[str]]) -> Dict[str, Any]:
+    """ProjectionExpression kwargs for a read, or none to return whole items."""
+    if not fields:
+        return {}
+    # Aliased so reserved words (e.g. "city") are safe; boto3 merges its own #n names for conditions
+    names = {f"#p{i}": field for i, field in enumerate(fields)}
+    return {
+        "ProjectionExpression": ", ".join(names),
+        "ExpressionAttributeNames": names,
+    }
+
+
+def _date_range_condition(start_date, end_date, date_field):
+    """Scan filter for bookings (never city records) with date_field inside the range."""
+    # Always exclude city records (they have city_id attribute)
+    condition = Attr("city_id").not_exists()
+    if start_date:
+        condition &= Attr(date_field).gte(start_date)
+    if end_date:
+        condition &= Attr(date_field).lte(end_date)
+    return condition
+
 
+def _months_between(start_date: str, end_date: str) -> List[str]:
+    """Every YYYY-MM partition from start_date's month through end_date's, inclusive."""
+    year, month = int(start_date[:4]), int(start_date[5:7])
+    end_year, end_month = int(end_date[:4]), int(end_date[5:7])
+    months = []
+    while (year, month) <= (end_year, end_month):
+        months.append(f"{year:04d}-{month:02d}")
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+    return months
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Parse the Premier Inn fixture with the real parser and print the result.
+
+Makes a live LLM call, so it lives outside tests/ where pytest never imports it.
+"""
+import pathlib
+import sys
+
+# Add project root to path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.parsers.booking import parse_email
+
+FIXTURE_PATH = PROJECT_ROOT / "tests" / "fixtures" / "hub_premier_inn_test.eml"
+
+
+def main():
+    parsed = parse_email(FIXTURE_PATH.read_bytes())
+    print(parsed)
+
+
+if __name__ == "__main__":
+    main()
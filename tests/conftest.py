@@ -1,8 +1,112 @@
 # tests/conftest.py
 import os
+import pathlib
 import sys
+from functools import lru_cache
+from unittest.mock import create_autospec
+
+import pytest
 
 # Ensure project root (emailParse/) is on sys.path
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
+
+# boto3 clients are created at import time and need a region to resolve endpoints
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+FIXTURE_DIR = pathlib.Path(__file__).parent / "fixtures"
+
+
+@lru_cache(maxsize=None)
+def load_fixture_bytes(name: str) -> bytes:
+    """Raw bytes of a fixture email, read from disk once per session."""
+    return (FIXTURE_DIR / name).read_bytes()
+
+
+@pytest.fixture(scope="session")
+def raw_email_bytes() -> bytes:
+    """The hub by Premier Inn confirmation email."""
+    return load_fixture_bytes("hub_premier_inn_test.eml")
+
+
+@pytest.fixture(scope="session")
+def canned_booking():
+    """Booking as the LLM returns it for the Premier Inn fixture, built once per session."""
+    from app.models.booking import Booking
+
+    return Booking(
+        guest_name="Test Guest",
+        provider_name="hub by Premier Inn",
+        confirmation="MAQ1101970",
+        check_in_date="2025-03-20",
+        check_out_date="2025-03-28",
+        check_in_time="3pm",
+        check_out_time="12pm",
+        early_check_in_time="12pm",
+        early_check_in_cost="GBP 15",
+        breakfast_included=False,
+        cancellation_terms="",
+        street_address="Old Marylebone Road",
+        city="London",
+        postal_code="NW1 5DZ",
+        booking_date="2025-01-20",
+        what3words="///talent.actors.ideal",
+        website="https://premierinn.com/",
+        amount_paid="0",
+        amount_total="100",
+        room_type="Standard",
+    )
+
+
+@lru_cache(maxsize=None)
+def _s3_client_spec():
+    """Autospec of the handler's S3 client, built once; typos like get_objekt fail loudly."""
+    from app.functions import s3_store_email
+
+    return create_autospec(s3_store_email.s3, instance=True)
+
+
+@pytest.fixture
+def app_s3_mock(monkeypatch):
+    """The handler's module-level S3 client swapped for the shared autospec."""
+    mock = _s3_client_spec()
+    monkeypatch.setattr("app.functions.s3_store_email.s3", mock)
+    yield mock
+    mock.reset_mock(return_value=True, side_effect=True)
+
+
+@pytest.fixture
+def dynamodb_stub():
+    """Stubber on the shared DynamoDB client; every queued response must be consumed."""
+    from botocore.stub import Stubber
+    from app.functions.aws import get_resource
+
+    with Stubber(get_resource("dynamodb").meta.client) as stubber:
+        yield stubber
+        stubber.assert_no_pending_responses()
+
+
+@pytest.fixture
+def dynamodb_client_stub():
+    """Stubber on the plain DynamoDB client, which sends params exactly as given."""
+    from botocore.stub import Stubber
+    from app.functions.aws import get_client
+
+    with Stubber(get_client("dynamodb")) as stubber:
+        yield stubber
+        stubber.assert_no_pending_responses()
+
+
+def pytest_collection_modifyitems(config, items):
+    """Fail collection if two test modules share a basename (copy-pasted test files)."""
+    modules = {}
+    for item in items:
+        path = pathlib.Path(str(item.fspath))
+        if path.name.startswith("test_"):
+            modules.setdefault(path.name, set()).add(path)
+
+    duplicates = {name: paths for name, paths in modules.items() if len(paths) > 1}
+    if duplicates:
+        listing = "; ".join(f"{name}: {sorted(map(str, paths))}" for name, paths in duplicates.items())
+        raise pytest.UsageError(f"Duplicate test module names: {listing}")
@@ -0,0 +1,110 @@
+# tests/test_bookings_router.py
+import json
+import logging
+
+import pytest
+
+pytest.importorskip("httpx")  # required by fastapi.testclient
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from app.routers import bookings
+from app.schemas.booking import BookingResponse
+
+
+class StubDBService:
+    """Serves canned items for the date-range lookups and records the call."""
+
+    def __init__(self, items):
+        self.items = items
+        self.calls = []
+
+    def iter_bookings_by_date_range(self, **kwargs):
+        self.calls.append(kwargs)
+        yield from self.items
+
+    def get_bookings_by_date_range(self, **kwargs):
+        self.calls.append(kwargs)
+        return list(self.items)
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(bookings.router)
+    return TestClient(app)
+
+
+def test_stream_returns_one_booking_per_line(client, monkeypatch):
+    items = [
+        {"confirmation": "A", "city": "London", "amount_total": "100"},
+        {"confirmation": "B", "check_in_date": "2025-03-20"},
+    ]
+    db_service = StubDBService(items)
+    monkeypatch.setattr(bookings, "db_service", db_service)
+
+    response = client.get(
+        "/bookings/",
+        params={"start_date": "2025-03-01", "end_date": "2025-03-31", "stream": "true"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.text.splitlines()
+    assert [BookingResponse.model_validate(json.loads(line)) for line in lines] == [
+        BookingResponse.model_validate(item) for item in items
+    ]
+    assert db_service.calls == [{
+        "start_date": "2025-03-01",
+        "end_date": "2025-03-31",
+        "date_field": "check_in_date",
+        "fields": bookings.BOOKING_RESPONSE_FIELDS,
+    }]
+
+
+def test_stream_with_no_bookings_is_empty(client, monkeypatch):
+    monkeypatch.setattr(bookings, "db_service", StubDBService([]))
+
+    response = client.get("/bookings/", params={"stream": "true"})
+
+    assert response.status_code == 200
+    assert response.text == ""
+
+
+def test_stream_span_detaches_cleanly(client, monkeypatch, caplog):
+    """The stream's span opens and closes in one context, so OpenTelemetry never fails to detach it."""
+    from app import _observability
+
+    _observability.configure()
+    monkeypatch.setattr(bookings, "db_service", StubDBService([{"confirmation": "A"}, {"confirmation": "B"}]))
+
+    with caplog.at_level(logging.ERROR, logger="opentelemetry.context"):
+        response = client.get("/bookings/", params={"stream": "true"})
+
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 2
+    assert not [r for r in caplog.records if "detach" in r.getMessage()]
+
+
+def test_list_validates_every_booking(client, monkeypatch):
+    monkeypatch.setattr(bookings, "db_service", StubDBService([
+        {"confirmation": "A", "breakfast_included": "true", "amount_total": "100"},
+    ]))
+
+    response = client.get("/bookings/")
+
+    assert response.status_code == 200
+    assert response.json()["count"] == 1
+    # Coerced by validation, not passed through as the stored string
+    assert response.json()["bookings"][0]["breakfast_included"] is True
+
+
+def test_list_rejects_malformed_bookings(client, monkeypatch):
+    monkeypatch.setattr(bookings, "db_service", StubDBService([
+        {"confirmation": "A", "breakfast_included": "yes-ish", "latitude": 51.5},
+    ]))
+
+    with pytest.raises(ValidationError):
+        client.get("/bookings/")
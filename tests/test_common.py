@@ -0,0 +1,212 @@
+# tests/test_common.py
+import pytest
+from botocore.exceptions import ClientError
+from botocore.stub import ANY
+from pydantic import HttpUrl
+
+from app.functions import common
+from app.functions.common import batch_get_items, batch_store_results, merge_item
+from app.models.booking import Booking
+
+TABLE = "bookings"
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Backoff delays requested by batch_get_items, without actually sleeping."""
+    delays = []
+    monkeypatch.setattr("app.functions.common.time.sleep", delays.append)
+    return delays
+
+
+def test_merge_item_keeps_stored_values_and_created_at():
+    booking = Booking.model_construct(
+        confirmation="ABC123",
+        guest_name="New Guest",
+        city="",
+        check_in_date="2025-03-20",
+        website=HttpUrl("https://premierinn.com/"),
+    )
+    existing = {
+        "confirmation": "ABC123",
+        "guest_name": "Old Guest",
+        "city": "London",
+        "latitude": "51.5",
+        "created_at": "2025-01-01T00:00:00+00:00",
+    }
+
+    item = merge_item(booking, {"confirmation": "ABC123"}, existing, now="2025-03-01T12:00:00+00:00")
+
+    assert item["guest_name"] == "New Guest"
+    # Empty strings never clobber what is already stored
+    assert item["city"] == "London"
+    assert item["latitude"] == "51.5"
+    assert item["website"] == "https://premierinn.com/"
+    assert item["check_in_month"] == "2025-03"
+    assert item["created_at"] == "2025-01-01T00:00:00+00:00"
+    assert item["updated_at"] == "2025-03-01T12:00:00+00:00"
+    # The caller's existing item is not modified
+    assert existing["guest_name"] == "Old Guest"
+
+
+def test_merge_item_new_item_gets_created_at():
+    booking = Booking.model_construct(confirmation="ABC123", guest_name="Guest")
+
+    item = merge_item(booking, {"confirmation": "ABC123"}, now="2025-03-01T12:00:00+00:00")
+
+    assert item == {
+        "confirmation": "ABC123",
+        "guest_name": "Guest",
+        "updated_at": "2025-03-01T12:00:00+00:00",
+        "created_at": "2025-03-01T12:00:00+00:00",
+    }
+
+
+def test_batch_get_items_retries_unprocessed_keys(dynamodb_stub, sleeps):
+    dynamodb_stub.add_response(
+        "batch_get_item",
+        {
+            "Responses": {TABLE: [{"confirmation": {"S": "A"}, "city": {"S": "London"}}]},
+            "UnprocessedKeys": {TABLE: {"Keys": [{"confirmation": {"S": "B"}}]}},
+        },
+        {"RequestItems": {TABLE: {"Keys": [{"confirmation": "A"}, {"confirmation": "B"}]}}},
+    )
+    dynamodb_stub.add_response(
+        "batch_get_item",
+        {"Responses": {TABLE: [{"confirmation": {"S": "B"}}]}},
+        {"RequestItems": {TABLE: {"Keys": [{"confirmation": "B"}]}}},
+    )
+
+    found = batch_get_items(["A", "B", "A"], TABLE)
+
+    assert found == {"A": {"confirmation": "A", "city": "London"}, "B": {"confirmation": "B"}}
+    assert len(sleeps) == 1
+    assert 0 <= sleeps[0] <= common.BATCH_GET_BACKOFF_MAX
+
+
+def test_batch_get_items_gives_up_after_max_retries(dynamodb_stub, sleeps, monkeypatch):
+    monkeypatch.setattr(common, "BATCH_GET_MAX_RETRIES", 2)
+    # A new dict per response: boto3 deserializes responses in place
+    for _ in range(3):
+        dynamodb_stub.add_response(
+            "batch_get_item",
+            {"Responses": {TABLE: []}, "UnprocessedKeys": {TABLE: {"Keys": [{"confirmation": {"S": "A"}}]}}},
+        )
+
+    with pytest.raises(RuntimeError, match="unprocessed keys"):
+        batch_get_items(["A"], TABLE)
+
+    assert len(sleeps) == 2
+
+
+def test_batch_store_results_writes_every_item(dynamodb_stub):
+    items = [{"confirmation": "A", "city": "London"}, {"confirmation": "B", "city": "Paris"}]
+    dynamodb_stub.add_response(
+        "batch_write_item",
+        {"UnprocessedItems": {}},
+        {"RequestItems": {TABLE: [{"PutRequest": {"Item": item}} for item in items]}},
+    )
+
+    batch_store_results(items, TABLE)
+
+
+def test_update_table_sends_marshalled_values_once(dynamodb_client_stub):
+    booking = Booking.model_construct(confirmation="ABC123", guest_name="Guest", city="", check_in_date="2025-03-20")
+    dynamodb_client_stub.add_response(
+        "update_item",
+        {"Attributes": {"confirmation": {"S": "ABC123"}, "guest_name": {"S": "Guest"}}},
+        {
+            "TableName": TABLE,
+            "Key": {"confirmation": {"S": "ABC123"}},
+            "UpdateExpression": (
+                "SET updated_at = :updated_at, "
+                "created_at = if_not_exists(created_at, :created_at), "
+                "#f_guest_name = :guest_name, #f_check_in_date = :check_in_date, "
+                "#f_check_in_month = :check_in_month"
+            ),
+            "ExpressionAttributeNames": {
+                "#f_guest_name": "guest_name",
+                "#f_check_in_date": "check_in_date",
+                "#f_check_in_month": "check_in_month",
+            },
+            "ExpressionAttributeValues": {
+                ":updated_at": {"S": ANY},
+                ":created_at": {"S": ANY},
+                ":guest_name": {"S": "Guest"},
+                ":check_in_date": {"S": "2025-03-20"},
+                ":check_in_month": {"S": "2025-03"},
+            },
+            "ReturnValues": "ALL_NEW",
+        },
+    )
+
+    response = common.update_table(booking, {"confirmation": "ABC123"}, TABLE)
+
+    assert response["Attributes"] == {"confirmation": "ABC123", "guest_name": "Guest"}
+
+
+def test_put_new_item_conditional_put(dynamodb_client_stub, monkeypatch):
+    monkeypatch.setattr(common, "utc_now_iso", lambda: "2025-03-01T12:00:00+00:00")
+    booking = Booking.model_construct(confirmation="ABC123", guest_name="Guest", check_in_date="2025-03-20")
+    dynamodb_client_stub.add_response(
+        "put_item",
+        {},
+        {
+            "TableName": TABLE,
+            "Item": {
+                "confirmation": {"S": "ABC123"},
+                "guest_name": {"S": "Guest"},
+                "check_in_date": {"S": "2025-03-20"},
+                "check_in_month": {"S": "2025-03"},
+                "updated_at": {"S": "2025-03-01T12:00:00+00:00"},
+                "created_at": {"S": "2025-03-01T12:00:00+00:00"},
+            },
+            "ConditionExpression": "attribute_not_exists(#k_confirmation)",
+            "ExpressionAttributeNames": {"#k_confirmation": "confirmation"},
+        },
+    )
+
+    response = common.put_new_item(booking, {"confirmation": "ABC123"}, TABLE)
+
+    assert response["Attributes"]["check_in_month"] == "2025-03"
+    assert response["Attributes"]["created_at"] == "2025-03-01T12:00:00+00:00"
+
+
+def test_put_new_item_falls_back_to_update_when_key_exists(dynamodb_client_stub):
+    booking = Booking.model_construct(confirmation="ABC123", guest_name="Guest")
+    dynamodb_client_stub.add_client_error("put_item", "ConditionalCheckFailedException")
+    dynamodb_client_stub.add_response(
+        "update_item",
+        {"Attributes": {
+            "confirmation": {"S": "ABC123"},
+            "guest_name": {"S": "Guest"},
+            "created_at": {"S": "2025-01-01T00:00:00+00:00"},
+        }},
+        {
+            "TableName": TABLE,
+            "Key": {"confirmation": {"S": "ABC123"}},
+            "UpdateExpression": (
+                "SET updated_at = :updated_at, "
+                "created_at = if_not_exists(created_at, :created_at), "
+                "#f_guest_name = :guest_name"
+            ),
+            "ExpressionAttributeNames": {"#f_guest_name": "guest_name"},
+            "ExpressionAttributeValues": ANY,
+            "ReturnValues": "ALL_NEW",
+        },
+    )
+
+    response = common.put_new_item(booking, {"confirmation": "ABC123"}, TABLE)
+
+    # The stored created_at survives
+    assert response["Attributes"]["created_at"] == "2025-01-01T00:00:00+00:00"
+
+
+def test_put_new_item_reraises_other_errors(dynamodb_client_stub):
+    booking = Booking.model_construct(confirmation="ABC123", guest_name="Guest")
+    dynamodb_client_stub.add_client_error("put_item", "ProvisionedThroughputExceededException")
+
+    with pytest.raises(ClientError) as excinfo:
+        common.put_new_item(booking, {"confirmation": "ABC123"}, TABLE)
+
+    assert excinfo.value.response["Error"]["Code"] == "ProvisionedThroughputExceededException"
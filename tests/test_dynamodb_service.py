@@ -0,0 +1,154 @@
+# tests/test_dynamodb_service.py
+import json
+
+import pytest
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.stub import ANY
+
+from app.services.dynamodb_service import DynamoDBService, _months_between, _projection
+
+TABLE = "bookings"
+INDEX = "check_in_month-index"
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """DynamoDBService reading the bookings table through the check-in date GSI."""
+    monkeypatch.setenv("BOOKINGS_TABLE_NAME", TABLE)
+    monkeypatch.setenv("BOOKINGS_DATE_INDEX_NAME", INDEX)
+    return DynamoDBService()
+
+
+@pytest.fixture
+def scan_service(monkeypatch):
+    """DynamoDBService without a date index, so every range lookup scans."""
+    monkeypatch.setenv("BOOKINGS_TABLE_NAME", TABLE)
+    monkeypatch.delenv("BOOKINGS_DATE_INDEX_NAME", raising=False)
+    return DynamoDBService()
+
+
+def _month_query(month, start_date, end_date):
+    return {
+        "TableName": TABLE,
+        "IndexName": INDEX,
+        "KeyConditionExpression": Key("check_in_month").eq(month) & Key("check_in_date").between(start_date, end_date),
+    }
+
+
+@pytest.mark.parametrize(
+    "start_date, end_date, expected",
+    [
+        ("2025-03-20", "2025-03-28", ["2025-03"]),
+        ("2025-11-17", "2026-02-01", ["2025-11", "2025-12", "2026-01", "2026-02"]),
+        ("2025-12-31", "2026-01-01", ["2025-12", "2026-01"]),
+        ("2025-05-01", "2025-04-30", []),
+    ],
+)
+def test_months_between(start_date, end_date, expected):
+    assert _months_between(start_date, end_date) == expected
+
+
+def test_projection_aliases_every_field():
+    assert _projection(None) == {}
+    assert _projection([]) == {}
+    assert _projection(["confirmation", "city"]) == {
+        "ProjectionExpression": "#p0, #p1",
+        "ExpressionAttributeNames": {"#p0": "confirmation", "#p1": "city"},
+    }
+
+
+def test_date_range_queries_each_month_partition(service, dynamodb_stub):
+    dynamodb_stub.add_response(
+        "query",
+        {"Items": [{"confirmation": {"S": "A"}, "amount_total": {"N": "100"}}],
+         "LastEvaluatedKey": {"confirmation": {"S": "A"}}},
+        _month_query("2025-12", "2025-12-30", "2026-01-02"),
+    )
+    dynamodb_stub.add_response(
+        "query",
+        {"Items": [{"confirmation": {"S": "B"}}]},
+        {**_month_query("2025-12", "2025-12-30", "2026-01-02"), "ExclusiveStartKey": {"confirmation": "A"}},
+    )
+    dynamodb_stub.add_response(
+        "query",
+        {"Items": [{"confirmation": {"S": "C"}}]},
+        _month_query("2026-01", "2025-12-30", "2026-01-02"),
+    )
+
+    items = service.get_bookings_by_date_range("2025-12-30", "2026-01-02")
+
+    assert items == [{"confirmation": "A", "amount_total": "100"}, {"confirmation": "B"}, {"confirmation": "C"}]
+
+
+def test_date_range_start_after_end_reads_nothing(service, dynamodb_stub):
+    assert service.get_bookings_by_date_range("2025-05-01", "2025-04-30") == []
+
+
+def test_iter_date_range_is_lazy(service, dynamodb_stub):
+    # No responses queued: creating the iterator must not call DynamoDB
+    service.iter_bookings_by_date_range("2025-03-01", "2025-03-31")
+
+
+@pytest.mark.parametrize(
+    "start_date, end_date, date_field, index",
+    [
+        ("2025-03-01", None, "check_in_date", INDEX),
+        (None, "2025-03-31", "check_in_date", INDEX),
+        ("2025-03-01", "2025-03-31", "check_out_date", INDEX),
+        ("2025-03-01", "2025-03-31", "check_in_date", None),
+    ],
+)
+def test_iter_date_range_falls_back_to_scan(monkeypatch, dynamodb_stub, start_date, end_date, date_field, index):
+    monkeypatch.setenv("BOOKINGS_TABLE_NAME", TABLE)
+    if index:
+        monkeypatch.setenv("BOOKINGS_DATE_INDEX_NAME", index)
+    else:
+        monkeypatch.delenv("BOOKINGS_DATE_INDEX_NAME", raising=False)
+    dynamodb_stub.add_response(
+        "scan",
+        {"Items": [{"confirmation": {"S": "A"}}]},
+        {"TableName": TABLE, "FilterExpression": ANY},
+    )
+
+    items = list(DynamoDBService().iter_bookings_by_date_range(start_date, end_date, date_field))
+
+    assert items == [{"confirmation": "A"}]
+
+
+def test_parallel_scan_reads_every_segment(scan_service, dynamodb_stub):
+    # Segments run on threads in any order, so each response carries its own item
+    for segment in range(3):
+        dynamodb_stub.add_response("scan", {"Items": [{"confirmation": {"S": f"S{segment}"}}]})
+
+    items = scan_service._parallel_scan(segments=3)
+
+    assert sorted(item["confirmation"] for item in items) == ["S0", "S1", "S2"]
+
+
+def test_projected_parallel_scan_keeps_names_per_request(scan_service, dynamodb_stub):
+    """
+    Each segment's request carries the #p projection names plus boto3's #n
+    condition names, and the caller's dict is never mutated (boto3 deep-copies
+    DynamoDB params before filling in condition placeholders).
+    """
+    sent_names = []
+
+    def record_names(params, **_):
+        sent_names.append(json.loads(params["body"])["ExpressionAttributeNames"])
+
+    client = scan_service.dynamodb.meta.client
+    client.meta.events.register_first("before-call.*.*", record_names)
+    for segment in range(4):
+        dynamodb_stub.add_response("scan", {"Items": [{"confirmation": {"S": f"S{segment}"}}]})
+
+    projection = _projection(["confirmation", "city"])
+    try:
+        items = scan_service._parallel_scan(
+            segments=4, FilterExpression=Attr("city_id").not_exists(), **projection
+        )
+    finally:
+        client.meta.events.unregister("before-call.*.*", record_names)
+
+    assert len(items) == 4
+    assert projection["ExpressionAttributeNames"] == {"#p0": "confirmation", "#p1": "city"}
+    assert sent_names == [{"#p0": "confirmation", "#p1": "city", "#n0": "city_id"}] * 4
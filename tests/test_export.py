@@ -0,0 +1,134 @@
+# tests/test_export.py
+import re
+
+import pytest
+
+from app.routers import export
+
+TRIP = "UK"
+
+CITIES = [
+    {"city_name": "London", "visits": [{"trip": TRIP, "start_date": "2025-03-20", "end_date": "2025-03-23"}]},
+    {"city_name": "York", "visits": [
+        {"trip": TRIP, "start_date": "2025-03-23", "end_date": "2025-03-25"},
+        {"trip": "Other", "start_date": "2025-06-01", "end_date": "2025-06-02"},
+    ]},
+    {"city_name": "Edinburgh", "visits": [{"trip": TRIP, "start_date": "2025-03-25", "end_date": "2025-03-28"}]},
+]
+
+BOOKINGS = [
+    # Hotels: matched on cleaned, case-insensitive city and check-in inside the visit
+    {"confirmation": "H1", "booking_type": "hotel", "provider_name": "hub by Premier Inn", "city": " LONDON ",
+     "check_in_date": "2025-03-20", "check_in_time": "3pm", "check_out_time": "12pm",
+     "breakfast_included": True, "street_address": "Old Marylebone Road", "postal_code": "NW1 5DZ",
+     "website": "https://premierinn.com/"},
+    {"confirmation": "H2", "provider_name": "Grays Court", "city": "York", "check_in_date": "2025-03-23",
+     "breakfast_included": False},
+    {"confirmation": "H3", "booking_type": "hotel", "provider_name": "Hotel Paris", "city": "Paris",
+     "check_in_date": "2025-03-21"},
+    # Transit with explicit cities: London departure and York arrival
+    {"confirmation": "T1", "booking_type": "train", "provider_name": "LNER", "route_number": "1S12",
+     "departure_city": "London", "arrival_city": "York", "departure_station": "Kings Cross",
+     "arrival_station": "York", "check_in_date": "2025-03-23", "check_in_time": "10:00",
+     "check_out_date": "2025-03-23", "check_out_time": "11:52"},
+    # Second arrival into York the same day is rendered under "### Local"
+    {"confirmation": "T4", "booking_type": "train", "provider_name": "Northern", "arrival_city": "york",
+     "check_in_date": "2025-03-23", "check_out_date": "2025-03-23", "check_out_time": "13:05"},
+    # No departure/arrival city: departure falls back to the city field, arrival to the date
+    {"confirmation": "T2", "booking_type": "train", "provider_name": "CrossCountry", "city": "York",
+     "check_in_date": "2025-03-25", "check_in_time": "09:00", "check_out_date": "2025-03-25",
+     "check_out_time": "11:30"},
+    {"confirmation": "T3", "booking_type": "flight", "provider_name": "BA", "departure_city": "Edinburgh",
+     "arrival_city": "Paris", "check_in_date": "2025-03-27"},
+]
+
+EXPECTED_NOTE = """\
+---
+parent: "[[Travel]]"
+type: travel-sync
+trip: "UK"
+synced_at: "<now>"
+decimalLink: "[[15.52 Active Trips]]"
+---
+
+# Summary
+### Days:
+8
+
+# London
+March 20 - 23
+[[London]]
+## Hotel
+hub by Premier Inn
+Breakfast included
+Check-in and Out: 3pm / 12pm
+
+Old Marylebone Road, LONDON, NW1 5DZ
+https://premierinn.com/
+H1
+## Departure - Sunday March 23
+LNER 1S12
+Kings Cross 10:00
+York 11:52
+T1
+
+# York
+March 23 - 25
+[[York]]
+## Arrival - Sunday March 23
+LNER 1S12 11:52 York
+T1
+### Local
+Northern 13:05
+T4
+## Hotel
+Grays Court
+Breakfast not included
+
+York
+H2
+## Departure - Tuesday March 25
+CrossCountry
+09:00
+11:30
+T2
+
+# Edinburgh
+March 25 - 28
+[[Edinburgh]]
+## Arrival - Tuesday March 25
+CrossCountry 11:30
+T2
+
+# Unmatched Bookings
+## Paris Hotel
+Hotel Paris
+
+Paris
+H3
+## BA
+BA
+T3
+"""
+
+
+class StubDBService:
+    def get_cities_by_trip(self, trip_name):
+        return CITIES
+
+    def get_bookings_by_date_range(self, **kwargs):
+        assert kwargs == {"start_date": "2025-03-20", "end_date": "2025-03-28", "date_field": "check_in_date"}
+        return BOOKINGS
+
+
+@pytest.fixture
+def stub_db_service(monkeypatch):
+    monkeypatch.setattr(export, "db_service", StubDBService())
+
+
+def test_trip_note_itinerary(stub_db_service):
+    note = export.export_trip_note_for_obsidian(TRIP)
+
+    assert note.filename == "UK Trip Reservations.md"
+    content = re.sub(r'^synced_at: ".*"$', 'synced_at: "<now>"', note.content, flags=re.M)
+    assert content == EXPECTED_NOTE
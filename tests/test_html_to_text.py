@@ -0,0 +1,61 @@
+# tests/test_html_to_text.py
+import time
+
+from app.parsers.booking import MAX_LLM_TEXT_CHARS, _html_to_text
+
+
+def test_drops_head_style_and_script():
+    html = (
+        "<html><head><title>Your stay</title><style>p { color: red }</style></head>"
+        "<body><script>track()</script><p>Check-in 3pm</p><style>.x{}</style></body></html>"
+    )
+
+    assert _html_to_text(html) == "Check-in 3pm"
+
+
+def test_collapses_whitespace_and_drops_blank_lines():
+    html = (
+        "<body><p>  Booking \t reference:\n   MAQ1101970  </p>"
+        "<div>\n\n   \n</div><p>Old&nbsp;&nbsp;Marylebone   Road</p></body>"
+    )
+
+    assert _html_to_text(html) == "Booking reference:\nMAQ1101970\nOld Marylebone Road"
+
+
+def test_appends_link_hosts_once_in_order():
+    html = (
+        '<body><p>Manage booking</p>'
+        '<a href="https://www.premierinn.com/manage?id=1">Manage</a>'
+        '<a href="mailto:help@premierinn.com">Email us</a>'
+        '<a href="/relative">Relative</a>'
+        '<a href="http://what3words.com/talent.actors.ideal">Map</a>'
+        '<a href="https://www.premierinn.com/terms">Terms</a></body>'
+    )
+
+    assert _html_to_text(html) == (
+        "Manage booking\nManage\nEmail us\nRelative\nMap\nTerms"
+        "\n\nLinks: www.premierinn.com, what3words.com"
+    )
+
+
+def test_caps_text_and_skips_links_when_over_the_limit():
+    html = "<body>" + "<p>Room details</p>" * 2_000 + '<a href="https://premierinn.com/">x</a></body>'
+
+    text = _html_to_text(html)
+
+    assert len(text) == MAX_LLM_TEXT_CHARS
+    assert text.startswith("Room details\nRoom details")
+    assert "Links:" not in text
+
+
+def test_long_whitespace_run_is_linear():
+    """A huge whitespace run with no newline collapses to one space without backtracking."""
+    html = "<body><p>Check-in" + " \t" * 200_000 + "3pm</p></body>"
+
+    start = time.perf_counter()
+    text = _html_to_text(html)
+    elapsed = time.perf_counter() - start
+
+    assert text == "Check-in 3pm"
+    # A backtracking \s*\n\s* pass took about 0.7s on a 20k run; this is ~1ms
+    assert elapsed < 0.5
@@ -1,219 +1,262 @@
 # tests/test_lambda_handler.py
-import pathlib
-from unittest.mock import Mock, patch, MagicMock
+import copy
+import io
+from types import SimpleNamespace
+from unittest.mock import ANY, Mock, patch
+
 import pytest
-from app.app import lambda_handler
+from botocore.exceptions import ClientError
+from conftest import load_fixture_bytes
+from app.functions import s3_store_email
+from app.functions.s3_store_email import lambda_handler
+
+
+@pytest.fixture(autouse=True)
+def clear_seen_objects():
+    """Each test starts with a cold dedup cache."""
+    s3_store_email._seen_objects.clear()
+    yield
+    s3_store_email._seen_objects.clear()
+
+
+# Read once at import; every mocked GetObject streams a fresh copy via _body()
+_EMAIL_BYTES = load_fixture_bytes("hub_premier_inn_test.eml")
 
-FIXTURE_DIR = pathlib.Path(__file__).parent / "fixtures"
+# The handler never reads the context; a plain namespace keeps stray
+# attribute access from silently succeeding like it would on a Mock
+_LAMBDA_CONTEXT = SimpleNamespace(
+    aws_request_id="test",
+    function_name="test",
+    get_remaining_time_in_millis=lambda: 30000,
+)
 
 
-def load_email_bytes(name: str) -> bytes:
-    """Helper to load raw email content as bytes from fixtures."""
-    path = FIXTURE_DIR / name
-    return path.read_bytes()
+@pytest.fixture(autouse=True)
+def stub_parse_email(request, monkeypatch, canned_booking):
+    """Skip the LLM-backed parse_email unless the test is marked integration."""
+    if request.node.get_closest_marker("integration") is not None:
+        return None
+    stub = Mock(return_value=canned_booking)
+    monkeypatch.setattr("app.functions.s3_store_email.parse_email", stub)
+    return stub
+
+
+# Built once; create_s3_event deep-copies it and fills in bucket and key
+_S3_EVENT_TEMPLATE = {
+    "Records": [
+        {
+            "eventVersion": "2.1",
+            "eventSource": "aws:s3",
+            "awsRegion": "us-east-1",
+            "eventTime": "2025-03-20T11:22:42.000Z",
+            "eventName": "ObjectCreated:Put",
+            "s3": {
+                "s3SchemaVersion": "1.0",
+                "configurationId": "testConfigRule",
+                "bucket": {
+                    "name": None,
+                    "ownerIdentity": {"principalId": "EXAMPLE"},
+                    "arn": None,
+                },
+                "object": {
+                    "key": None,
+                    "size": 1024,
+                    "eTag": "0123456789abcdef0123456789abcdef",
+                    "sequencer": "0A1B2C3D4E5F678901",
+                },
+            },
+        }
+    ]
+}
 
 
 def create_s3_event(bucket_name: str, object_key: str) -> dict:
     """Create a mock AWS Lambda S3 event structure."""
-    return {
-        "Records": [
-            {
-                "eventVersion": "2.1",
-                "eventSource": "aws:s3",
-                "awsRegion": "us-east-1",
-                "eventTime": "2025-03-20T11:22:42.000Z",
-                "eventName": "ObjectCreated:Put",
-                "s3": {
-                    "s3SchemaVersion": "1.0",
-                    "configurationId": "testConfigRule",
-                    "bucket": {
-                        "name": bucket_name,
-                        "ownerIdentity": {"principalId": "EXAMPLE"},
-                        "arn": f"arn:aws:s3:::{bucket_name}",
-                    },
-                    "object": {
-                        "key": object_key,
-                        "size": 1024,
-                        "eTag": "0123456789abcdef0123456789abcdef",
-                        "sequencer": "0A1B2C3D4E5F678901",
-                    },
-                },
-            }
-        ]
-    }
+    event = copy.deepcopy(_S3_EVENT_TEMPLATE)
+    s3_info = event["Records"][0]["s3"]
+    s3_info["bucket"]["name"] = bucket_name
+    s3_info["bucket"]["arn"] = f"arn:aws:s3:::{bucket_name}"
+    s3_info["object"]["key"] = object_key
+    return event
+
+
+def _body() -> io.BytesIO:
+    """Fresh streamable GetObject Body over the fixture email, like botocore's StreamingBody."""
+    return io.BytesIO(_EMAIL_BYTES)
+
+
+def _rec(bucket: str, key: str, source: str = "aws:s3") -> dict:
+    """Minimal event record; the handler only reads eventSource, bucket and key."""
+    return {"eventSource": source, "s3": {"bucket": {"name": bucket}, "object": {"key": key}}}
+
+
+@pytest.fixture
+def records(request) -> dict:
+    """Event built from parametrized (bucket, key, source) tuples."""
+    return {"Records": [_rec(*r) for r in request.param]}
 
 
-@patch("app.app.s3")
-@patch("app.app.store_result")
+@patch("app.functions.s3_store_email.batch_get_items", return_value={})
+@patch("app.functions.s3_store_email.batch_store_results")
 @pytest.mark.integration
-def test_lambda_handler_s3_event(mock_store_result, mock_s3_client):
+@pytest.mark.xdist_group("llm")
+def test_lambda_handler_s3_event(mock_store_results, mock_get_items, app_s3_mock):
     """Test lambda_handler processes S3 event and parses email."""
-    # Load the fixture email file
-    email_bytes = load_email_bytes("hub_premier_inn_test.eml")
-    
     # Mock S3 get_object response
     mock_s3_response = {
-        "Body": MagicMock(read=Mock(return_value=email_bytes))
+        "Body": _body()
     }
-    mock_s3_client.get_object.return_value = mock_s3_response
+    app_s3_mock.get_object.return_value = mock_s3_response
     
     # Create S3 event
     bucket_name = "test-email-bucket"
     object_key = "emails/hub_premier_inn_test.eml"
     event = create_s3_event(bucket_name, object_key)
     
-    # Mock context (Lambda context object)
-    context = Mock()
     
     # Call lambda_handler
-    result = lambda_handler(event, context)
+    result = lambda_handler(event, _LAMBDA_CONTEXT)
     
     # Verify S3 get_object was called with correct parameters
-    mock_s3_client.get_object.assert_called_once_with(
+    app_s3_mock.get_object.assert_called_once_with(
         Bucket=bucket_name,
         Key=object_key
     )
     
-    # Verify store_result was called
-    assert mock_store_result.called
+    # Verify the batch write was called once
+    mock_store_results.assert_called_once()
     
-    # Get the parsed result that was passed to store_result
-    call_args = mock_store_result.call_args[0][0]
+    # Get the items that were passed to batch_store_results
+    items = mock_store_results.call_args[0][0]
+    assert len(items) == 1
     
-    # Verify the parsed result has expected fields
-    assert "source_bucket" in call_args
-    assert call_args["source_bucket"] == bucket_name
-    assert "source_key" in call_args
-    assert call_args["source_key"] == object_key
-    assert "id" in call_args
+    # Verify the stored item has expected fields
+    item = items[0]
+    assert item["source_key"] == object_key
+    assert item["confirmation"]
+    assert "created_at" in item
+    assert "updated_at" in item
     
     # Verify return value
     assert result == {"statusCode": 200, "body": "OK"}
 
 
-@patch("app.app.s3")
-@patch("app.app.store_result")
-def test_lambda_handler_url_encoded_key(mock_store_result, mock_s3_client):
+@patch("app.functions.s3_store_email.geocode_address", return_value=None)
+@patch("app.functions.s3_store_email.batch_get_items", return_value={})
+@patch("app.functions.s3_store_email.batch_store_results")
+# S3 event keys are form-encoded: spaces arrive as %20 or +, non-ASCII as UTF-8 escapes
+@pytest.mark.parametrize(
+    "object_key_encoded, object_key_decoded",
+    [
+        ("emails/test%20email.eml", "emails/test email.eml"),
+        ("emails/a+b.eml", "emails/a b.eml"),
+        ("emails/%E2%98%83.eml", "emails/\u2603.eml"),
+    ],
+)
+def test_lambda_handler_url_encoded_key(mock_store_results, mock_get_items, mock_geocode, app_s3_mock,
+                                        object_key_encoded, object_key_decoded):
     """Test lambda_handler handles URL-encoded S3 object keys."""
-    email_bytes = load_email_bytes("hub_premier_inn_test.eml")
-    
-    mock_s3_response = {
-        "Body": MagicMock(read=Mock(return_value=email_bytes))
-    }
-    mock_s3_client.get_object.return_value = mock_s3_response
-    
+    app_s3_mock.get_object.return_value = {"Body": _body()}
+
     bucket_name = "test-email-bucket"
-    # URL-encoded key (spaces become + or %20)
-    object_key_encoded = "emails/test%20email.eml"
-    object_key_decoded = "emails/test email.eml"
-    
     event = create_s3_event(bucket_name, object_key_encoded)
-    context = Mock()
-    
-    result = lambda_handler(event, context)
-    
+
+    result = lambda_handler(event, _LAMBDA_CONTEXT)
+
     # Verify get_object was called with decoded key
-    mock_s3_client.get_object.assert_called_once_with(
+    app_s3_mock.get_object.assert_called_once_with(
         Bucket=bucket_name,
         Key=object_key_decoded
     )
-    
-    assert result == {"statusCode": 200, "body": "OK"}
 
-
-@patch("app.app.s3")
-@patch("app.app.store_result")
-def test_lambda_handler_s3_error(mock_store_result, mock_s3_client):
-    """Test lambda_handler handles S3 errors gracefully."""
-    from botocore.exceptions import ClientError
-    
-    # Mock S3 get_object to raise ClientError
-    mock_s3_client.get_object.side_effect = ClientError(
-        {"Error": {"Code": "NoSuchKey", "Message": "The specified key does not exist."}},
-        "GetObject"
-    )
-    
-    bucket_name = "test-email-bucket"
-    object_key = "emails/nonexistent.eml"
-    event = create_s3_event(bucket_name, object_key)
-    context = Mock()
-    
-    # Should not raise, but continue to next record
-    result = lambda_handler(event, context)
-    
-    # store_result should not be called if S3 fetch failed
-    assert not mock_store_result.called
-    
-    # Should still return success (error was logged, not fatal)
     assert result == {"statusCode": 200, "body": "OK"}
 
 
-@patch("app.app.s3")
-@patch("app.app.store_result")
-def test_lambda_handler_non_s3_event(mock_store_result, mock_s3_client):
-    """Test lambda_handler ignores non-S3 events."""
-    event = {
-        "Records": [
-            {
-                "eventSource": "aws:sqs",
-                "body": "some message"
-            }
-        ]
+@patch("app.functions.s3_store_email.geocode_address", return_value=None)
+@patch("app.functions.s3_store_email.batch_get_items", return_value={})
+@patch("app.functions.s3_store_email.batch_store_results")
+def test_lambda_handler_skips_replayed_event(mock_store_results, mock_get_items, mock_geocode, app_s3_mock, stub_parse_email):
+    """A redelivered S3 event (same key and eTag) is not downloaded or parsed again."""
+    app_s3_mock.get_object.return_value = {
+        "Body": _body()
     }
-    context = Mock()
-    
-    result = lambda_handler(event, context)
-    
-    # S3 client should not be called
-    assert not mock_s3_client.get_object.called
-    # store_result should not be called
-    assert not mock_store_result.called
-    
+    event = create_s3_event("test-email-bucket", "emails/replayed.eml")
+
+    lambda_handler(event, _LAMBDA_CONTEXT)
+    result = lambda_handler(event, _LAMBDA_CONTEXT)
+
+    app_s3_mock.get_object.assert_called_once()
+    stub_parse_email.assert_called_once()
+    mock_store_results.assert_called_once()
     assert result == {"statusCode": 200, "body": "OK"}
 
 
-@patch("app.app.s3")
-@patch("app.app.store_result")
-def test_lambda_handler_multiple_records(mock_store_result, mock_s3_client):
-    """Test lambda_handler processes multiple S3 records."""
-    email_bytes = load_email_bytes("hub_premier_inn_test.eml")
-    
-    mock_s3_response = {
-        "Body": MagicMock(read=Mock(return_value=email_bytes))
-    }
-    mock_s3_client.get_object.return_value = mock_s3_response
-    
-    # Create event with multiple records
-    event = {
-        "Records": [
-            {
-                "eventSource": "aws:s3",
-                "s3": {
-                    "bucket": {"name": "bucket1"},
-                    "object": {"key": "email1.eml"}
-                }
-            },
-            {
-                "eventSource": "aws:s3",
-                "s3": {
-                    "bucket": {"name": "bucket2"},
-                    "object": {"key": "email2.eml"}
-                }
-            },
-            {
-                "eventSource": "aws:sqs",  # This should be ignored
-                "body": "some message"
-            }
-        ]
-    }
-    context = Mock()
-    
-    result = lambda_handler(event, context)
-    
-    # Should process 2 S3 records
-    assert mock_s3_client.get_object.call_count == 2
-    # store_result should be called twice
-    assert mock_store_result.call_count == 2
-    
+_NO_SUCH_KEY = ClientError(
+    {"Error": {"Code": "NoSuchKey", "Message": "The specified key does not exist."}},
+    "GetObject",
+)
+
+
+@patch("app.functions.s3_store_email.geocode_address", return_value=None)
+@patch("app.functions.s3_store_email.batch_get_items", return_value={})
+@patch("app.functions.s3_store_email.batch_store_results")
+@pytest.mark.parametrize(
+    "records, s3_error, expected_gets, expected_stored",
+    [
+        pytest.param([("test-email-bucket", "emails/hub_premier_inn_test.eml", "aws:s3")], None, 1, 1, id="single"),
+        # A failed fetch is logged and skipped, not fatal
+        pytest.param([("test-email-bucket", "emails/nonexistent.eml", "aws:s3")], _NO_SUCH_KEY, 1, 0, id="s3-error"),
+        pytest.param([("", "", "aws:sqs")], None, 0, 0, id="non-s3"),
+        pytest.param(
+            [("bucket1", "email1.eml", "aws:s3"), ("bucket2", "email2.eml", "aws:s3"), ("", "", "aws:sqs")],
+            None, 2, 2, id="multiple-records",
+        ),
+    ],
+    indirect=["records"],
+)
+def test_lambda_handler_scenarios(mock_store_results, mock_get_items, mock_geocode, app_s3_mock,
+                                  records, s3_error, expected_gets, expected_stored):
+    """Only S3 records are fetched, and every parsed booking goes out in one batch write."""
+    # A fresh body per GetObject, as S3 returns a new stream for every call
+    app_s3_mock.get_object.side_effect = s3_error or (lambda **_: {"Body": _body()})
+
+    result = lambda_handler(records, _LAMBDA_CONTEXT)
+
+    assert app_s3_mock.get_object.call_count == expected_gets
+    if expected_stored:
+        mock_store_results.assert_called_once()
+        assert len(mock_store_results.call_args[0][0]) == expected_stored
+    else:
+        assert not mock_store_results.called
+
     assert result == {"statusCode": 200, "body": "OK"}
 
+
+def test_transfer_concurrency_fits_the_connection_pool():
+    """Every download thread fetching a large email at once stays within the shared pool."""
+    from app.functions.aws import BOTO_CONFIG
+
+    assert (
+        s3_store_email.S3_MAX_WORKERS * s3_store_email._TRANSFER_CONFIG.max_concurrency
+        <= BOTO_CONFIG.max_pool_connections
+    )
+
+
+@patch("app.functions.s3_store_email.geocode_address", return_value=None)
+@patch("app.functions.s3_store_email.batch_get_items", return_value={})
+@patch("app.functions.s3_store_email.batch_store_results")
+def test_lambda_handler_large_email_uses_ranged_download(mock_store_results, mock_get_items, mock_geocode, app_s3_mock, stub_parse_email):
+    """Emails at or above the multipart threshold go through download_fileobj."""
+    app_s3_mock.download_fileobj.side_effect = lambda bucket, key, fileobj, Config: fileobj.write(_EMAIL_BYTES)
+    event = create_s3_event("test-email-bucket", "emails/large.eml")
+    event["Records"][0]["s3"]["object"]["size"] = s3_store_email.MULTIPART_DOWNLOAD_THRESHOLD
+
+    result = lambda_handler(event, _LAMBDA_CONTEXT)
+
+    app_s3_mock.download_fileobj.assert_called_once_with(
+        "test-email-bucket", "emails/large.eml", ANY, Config=s3_store_email._TRANSFER_CONFIG
+    )
+    app_s3_mock.get_object.assert_not_called()
+    stub_parse_email.assert_called_once_with(_EMAIL_BYTES)
+    mock_store_results.assert_called_once()
+    assert result == {"statusCode": 200, "body": "OK"}
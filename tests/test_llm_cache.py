@@ -0,0 +1,129 @@
+# tests/test_llm_cache.py
+import json
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import EndpointConnectionError
+from botocore.stub import ANY
+
+from app.llm import extractors
+from app.llm.cache import prompt_digest, prompt_hash
+from app.models.booking import ExtractionResult, get_extract_booking_tool
+
+CACHE_TABLE = "llm-cache"
+EMAIL_TEXT = "Your hub by Premier Inn booking is confirmed"
+
+
+@pytest.fixture
+def cache_table(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_TABLE_NAME", CACHE_TABLE)
+
+
+@pytest.fixture
+def llm_client(monkeypatch):
+    client = Mock()
+    monkeypatch.setattr(extractors, "client", client)
+    return client
+
+
+@pytest.fixture
+def cache_key():
+    tool = json.dumps(get_extract_booking_tool(), sort_keys=True)
+    return prompt_hash(extractors.MODEL, extractors.SYSTEM_PROMPT, tool, EMAIL_TEXT)
+
+
+@pytest.fixture
+def tool_input(canned_booking):
+    """What Claude sends back: the canned booking with a non-ISO check-in date."""
+    booking = canned_booking.model_dump(mode="json")
+    booking["check_in_date"] = "20/03/2025"
+    return {"kind": "booking", "booking": booking}
+
+
+def _tool_response(tool_input):
+    return SimpleNamespace(
+        stop_reason="tool_use",
+        content=[SimpleNamespace(type="tool_use", input=tool_input)],
+    )
+
+
+def test_prefix_digest_gives_the_same_key():
+    prefix = prompt_digest("model", "system", "tool")
+
+    assert prompt_hash("email", prefix=prefix) == prompt_hash("model", "system", "tool", "email")
+    # The shared prefix is copied, not extended
+    assert prompt_hash("email", prefix=prefix) == prompt_hash("email", prefix=prefix)
+
+
+def test_cache_hit_skips_the_llm(cache_table, llm_client, dynamodb_stub, cache_key, canned_booking):
+    cached = ExtractionResult(kind="booking", booking=canned_booking).model_dump(mode="json")
+    dynamodb_stub.add_response(
+        "get_item",
+        {"Item": {"prompt_hash": {"S": cache_key}, "result": TypeSerializer().serialize(cached)}},
+        {"TableName": CACHE_TABLE, "Key": {"prompt_hash": cache_key}},
+    )
+
+    result = extractors.llm_extract_email(EMAIL_TEXT)
+
+    assert result.booking == canned_booking
+    llm_client.messages.create.assert_not_called()
+
+
+def test_cache_miss_stores_normalized_result(cache_table, llm_client, dynamodb_stub, cache_key, tool_input):
+    llm_client.messages.create.return_value = _tool_response(tool_input)
+    dynamodb_stub.add_response("get_item", {}, {"TableName": CACHE_TABLE, "Key": {"prompt_hash": cache_key}})
+    expected = dict(tool_input, booking=dict(tool_input["booking"], check_in_date="2025-03-20"))
+    dynamodb_stub.add_response(
+        "put_item",
+        {},
+        {"TableName": CACHE_TABLE, "Item": {"prompt_hash": cache_key, "result": expected, "expires_at": ANY}},
+    )
+
+    result = extractors.llm_extract_email(EMAIL_TEXT)
+
+    assert result.booking.check_in_date == "2025-03-20"
+    llm_client.messages.create.assert_called_once()
+
+
+def test_cache_errors_fall_through_to_the_llm(cache_table, llm_client, dynamodb_stub, tool_input):
+    llm_client.messages.create.return_value = _tool_response(tool_input)
+    dynamodb_stub.add_client_error("get_item", "ProvisionedThroughputExceededException")
+    dynamodb_stub.add_client_error("put_item", "ResourceNotFoundException")
+
+    result = extractors.llm_extract_email(EMAIL_TEXT)
+
+    assert result.kind == "booking"
+    llm_client.messages.create.assert_called_once()
+
+
+def test_cache_bypassed_without_table_name(monkeypatch, llm_client, dynamodb_stub, tool_input):
+    # No stubbed responses: any DynamoDB call would fail the test
+    monkeypatch.delenv("LLM_CACHE_TABLE_NAME", raising=False)
+    llm_client.messages.create.return_value = _tool_response(tool_input)
+
+    result = extractors.llm_extract_email(EMAIL_TEXT)
+
+    assert result.kind == "booking"
+    llm_client.messages.create.assert_called_once()
+
+
+def test_cache_connection_errors_fall_through_to_the_llm(cache_table, llm_client, tool_input):
+    from app.functions.aws import get_resource
+
+    client = get_resource("dynamodb").meta.client
+
+    def unreachable(**_):
+        raise EndpointConnectionError(endpoint_url="https://dynamodb.us-east-1.amazonaws.com")
+
+    # Fail before signing or sending, as a DNS/connect failure would
+    client.meta.events.register_first("before-call.*.*", unreachable)
+    llm_client.messages.create.return_value = _tool_response(tool_input)
+    try:
+        result = extractors.llm_extract_email(EMAIL_TEXT)
+    finally:
+        client.meta.events.unregister("before-call.*.*", unreachable)
+
+    assert result.kind == "booking"
+    llm_client.messages.create.assert_called_once()
@@ -1,25 +1,37 @@
-# tests/test_booking_parser.py
-import pathlib
-from datetime import date
+# tests/test_premier_inn_parser.py
+import base64
+
 import pytest
-from app.models.booking import Booking
-from app.parsers.booking import parse_email
+from app.models.booking import Booking, ExtractionResult
+from app.parsers.booking import _looks_like_booking, _parse_headers, parse_email
 
 
-FIXTURE_DIR = pathlib.Path(__file__).parent / "fixtures"
+@pytest.fixture(scope="session")
+def fake_llm_extract_email(canned_booking):
+    """Stand-in for llm_extract_email that returns the canned booking."""
+    result = ExtractionResult(kind="booking", booking=canned_booking)
+    return lambda _text: result
 
 
-def load_email(name: str) -> str:
-    """Helper to load raw email content from fixtures."""
-    path = FIXTURE_DIR / name
-    return path.read_text(encoding="utf-8")
+@pytest.fixture(autouse=True)
+def stub_llm(request, monkeypatch, fake_llm_extract_email):
+    """Unit tests never reach the LLM; integration tests keep the real call."""
+    if request.node.get_closest_marker("integration") is None:
+        monkeypatch.setattr("app.parsers.booking.llm_extract_email", fake_llm_extract_email)
 
 
-@pytest.mark.integration
-def test_parse_premier_inn_booking_basic():
-    raw_email = load_email("hub_premier_inn_test.eml")
+@pytest.fixture(scope="module")
+def parsed_hub_booking(raw_email_bytes, fake_llm_extract_email):
+    """parse_email run once over the fixture for the whole module."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("app.parsers.booking.llm_extract_email", fake_llm_extract_email)
+        return parse_email(raw_email_bytes)
 
-    booking = parse_email(raw_email)
+
+@pytest.mark.integration
+@pytest.mark.xdist_group("llm")
+def test_parse_premier_inn_booking_basic(raw_email_bytes):
+    booking = parse_email(raw_email_bytes)
 
     # Type sanity
     assert isinstance(booking, Booking)
@@ -27,78 +39,142 @@ def test_parse_premier_inn_booking_basic():
     # Core expectations
     assert booking.confirmation == "MAQ1101970"
 
-    assert booking.check_in_date == date(2025, 3, 20)
-    assert booking.check_out_date == date(2025, 3, 28)
+    assert booking.check_in_date == "2025-03-20"
+    assert booking.check_out_date == "2025-03-28"
 
     assert booking.check_in_time == "3pm"
     assert booking.check_out_time == "12pm"
 
-    assert booking.early_check_in == "available for GBP 15"
+    assert "15" in booking.early_check_in_cost
 
-    assert booking.address == "Old Marylebone Road, GB, NW1 5DZ"
+    assert booking.street_address.startswith("Old Marylebone Road")
+    assert booking.postal_code == "NW1 5DZ"
     assert booking.what3words == "///talent.actors.ideal"
 
     # Pydantic HttpUrl will normalize, so compare string form
     assert str(booking.website) == "https://premierinn.com/"
 
 
+EXPECTED_FIELDS = (
+    "confirmation",
+    "check_in_date",
+    "check_out_date",
+    "check_in_time",
+    "check_out_time",
+    "early_check_in_time",
+    "street_address",
+    "what3words",
+    "website",
+)
+
+
+def test_all_expected_fields_populated(parsed_hub_booking):
+    """Unit-level check: parse_email wiring + Booking fields, with fake LLM output."""
+    booking = parsed_hub_booking
+
+    for attr_name in EXPECTED_FIELDS:
+        assert hasattr(booking, attr_name), f"Missing attribute: {attr_name}"
+
+        value = getattr(booking, attr_name)
+        if isinstance(value, str):
+            assert value.strip() != "", f"Empty string for attribute: {attr_name}"
+        else:
+            assert value is not None, f"None value for attribute: {attr_name}"
+
+
+def test_prefilter_accepts_premier_inn_confirmation(raw_email_bytes):
+    """The header pre-filter must let real booking confirmations through to the LLM."""
+    assert _looks_like_booking(_parse_headers(raw_email_bytes))
+
+
 @pytest.mark.parametrize(
-    "attr_name",
+    "subject, from_addr, expected",
     [
-        "confirmation",
-        "check_in_date",
-        "check_out_date",
-        "check_in_time",
-        "check_out_time",
-        "early_check_in",
-        "address",
-        "what3words",
-        "website",
+        (b"=?utf-8?q?Your_booking_is_confirmed?=", b"news@deals.example.com", True),
+        (b"=?utf-8?b?T3VyIHN1bW1lciBzYWxl?=", b"news@deals.example.com", False),
+        # Unknown charsets fall back to the raw subject, then the sender allowlist
+        (b"=?x-mac-roman?q?booking?=", b"news@deals.example.com", True),
+        (b"=?bogus-charset?q?newsletter?=", b"hello@hubcomms.premierinn.com", True),
+        (b"=?bogus-charset?q?newsletter?=", b"news@deals.example.com", False),
     ],
 )
-def test_all_expected_fields_populated(monkeypatch, attr_name: str):
-    """Unit-level check: parse_email wiring + Booking fields, with fake LLM output."""
-    raw_email = load_email("hub_premier_inn_test.eml")
-
-    # Fake result coming back from llm_extract_email
-    from datetime import date
-    from app.models.booking import Booking
-
-    fake_booking = Booking(
-        confirmation="FAKE123",
-        check_in_date=date(2025, 3, 20),
-        check_out_date=date(2025, 3, 28),
-        check_in_time="3pm",
-        check_out_time="12pm",
-        early_check_in="available for GBP 15",
-        early_check_in_time="12:00",
-        address="Old Marylebone Road, GB, NW1 5DZ",
-        what3words="///talent.actors.ideal",
-        website="https://premierinn.com/",
-        name="hub by Premier Inn",
-        room_type="",
-        early_check_in_cost=15,
-        breakfast_included=True,
-        cancellation_terms="",
-        city="",
-        booking_date=date(2025, 1, 20),
-        amount_paid=0,
-        amount_total=100,
-     )
-
-    def fake_parse_email(_raw: str) -> Booking:
-        # you could also monkeypatch llm_extract_email instead;
-        # this is simpler for now.
-        return fake_booking
-
-    monkeypatch.setattr("app.parsers.booking.parse_email", fake_parse_email)
-
-    booking = parse_email(raw_email)
-
-    assert hasattr(booking, attr_name), f"Missing attribute: {attr_name}"
-
-    value = getattr(booking, attr_name)
-    if isinstance(value, str):
-        assert value.strip() != "", f"Empty string for attribute: {attr_name}"
-    else:
-        assert value is not None, f"None value for attribute: {attr_name}"
+def test_prefilter_encoded_word_subjects(subject, from_addr, expected):
+    """RFC 2047 subjects are decoded under compat32, and bad charsets never raise."""
+    raw_bytes = b"From: " + from_addr + b"\r\nSubject: " + subject + b"\r\n\r\nbody\r\n"
+
+    assert _looks_like_booking(_parse_headers(raw_bytes)) is expected
+
+
+def test_prefilter_rejects_newsletter(monkeypatch):
+    """Obvious marketing mail is rejected before any LLM call is made."""
+    def fail_llm(_text: str):
+        raise AssertionError("LLM should not be called for filtered emails")
+
+    monkeypatch.setattr("app.parsers.booking.llm_extract_email", fail_llm)
+
+    raw_bytes = (
+        b"From: Deals <news@deals.example.com>\r\n"
+        b"Subject: Our summer sale starts now\r\n"
+        b"Content-Type: text/html; charset=utf-8\r\n"
+        b"\r\n"
+        b"<html><body><p>Save 20% this weekend</p></body></html>\r\n"
+    )
+
+    with pytest.raises(ValueError, match="pre-filter"):
+        parse_email(raw_bytes)
+
+
+@pytest.fixture
+def llm_prompts(monkeypatch, fake_llm_extract_email):
+    """Texts handed to the (fake) LLM."""
+    prompts = []
+
+    def record(text):
+        prompts.append(text)
+        return fake_llm_extract_email(text)
+
+    monkeypatch.setattr("app.parsers.booking.llm_extract_email", record)
+    return prompts
+
+
+def test_plain_text_email_is_decoded_before_the_llm(llm_prompts):
+    """A single-part base64 text/plain email reaches the LLM as its decoded text, without headers."""
+    raw_bytes = (
+        b"From: Trainline <tickets@trainline.com>\r\n"
+        b"Subject: Your tickets\r\n"
+        b"MIME-Version: 1.0\r\n"
+        b"Content-Type: text/plain; charset=utf-8\r\n"
+        b"Content-Transfer-Encoding: base64\r\n"
+        b"\r\n"
+        + base64.encodebytes("Your booking MAQ12 – London to York\n\n  Coach C   Seat 14\n".encode("utf-8"))
+    )
+
+    parse_email(raw_bytes)
+
+    assert llm_prompts == ["Your booking MAQ12 – London to York\nCoach C Seat 14"]
+
+
+def test_plain_part_used_when_there_is_no_html(llm_prompts):
+    """In a multipart email without HTML, the inline text/plain part wins over attachments and the raw MIME."""
+    raw_bytes = (
+        b"From: Trainline <tickets@trainline.com>\r\n"
+        b"Subject: Your tickets\r\n"
+        b"MIME-Version: 1.0\r\n"
+        b'Content-Type: multipart/mixed; boundary="b1"\r\n'
+        b"\r\n"
+        b"--b1\r\n"
+        b"Content-Type: text/plain; charset=iso-8859-1\r\n"
+        b"Content-Transfer-Encoding: quoted-printable\r\n"
+        b"\r\n"
+        b"Caf=E9 stop on your journey\r\n"
+        b"--b1\r\n"
+        b"Content-Type: text/plain\r\n"
+        b'Content-Disposition: attachment; filename="terms.txt"\r\n'
+        b"\r\n"
+        b"Terms and conditions\r\n"
+        b"--b1--\r\n"
+    )
+
+    parse_email(raw_bytes)
+
+    assert llm_prompts == ["Café stop on your journey"]